@@ -1,10 +1,3 @@
-import importlib.metadata as _metalib
-
-try:
-    __version__ = _metalib.version(__package__ or __name__)
-except _metalib.PackageNotFoundError:
-    __version__ = "0.0.0.0.0"
-
 from . import colors, text
 from .constants import *  # All Constants
 from .entity import Entity
@@ -17,3 +10,17 @@ from .vec3 import Vec3
 from .world import World
 
 __all__ = ["Minecraft", "Vec3", "NBT"]
+
+
+def __getattr__(name: str) -> str:
+    # importlib.metadata is slow to import, only load it when the version is asked for
+    if name == "__version__":
+        import importlib.metadata as _metalib
+
+        global __version__
+        try:
+            __version__ = _metalib.version(__package__ or __name__)
+        except _metalib.PackageNotFoundError:
+            __version__ = "0.0.0.0.0"
+        return __version__
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
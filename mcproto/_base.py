@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable
 
 from .exception import raise_on_error
 from .mcpb import MinecraftStub
@@ -15,33 +15,69 @@ if TYPE_CHECKING:
 class HasStub:
     """Has a MinecraftStub and can use it for very generic things, such as running commands"""
 
+    __slots__ = ("_stub",)
+    _repr_fields: tuple[str, ...] = ()
+    # prepended to commands by runCommands, subclasses running commands in a context override it
+    _command_prefix: str = ""
+
     def __init__(self, stub: MinecraftStub) -> None:
         if not isinstance(stub, MinecraftStub):
             raise TypeError(f"Argument 'stub' must be of type MinecraftStub was '{type(stub)}'")
         self._stub = stub
 
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # public fields shown in repr, computed once per class instead of on every call
+        cls._repr_fields = tuple(
+            name
+            for klass in reversed(cls.__mro__)
+            for name in getattr(klass, "__slots__", ())
+            if not name.startswith("_")
+        )
+
     def __repr__(self) -> str:
         return (
             self.__class__.__qualname__
             + "("
-            + ", ".join(
-                f"{var}={val!r}" for var, val in self.__dict__.items() if not var.startswith("_")
-            )
+            + ", ".join(f"{var}={getattr(self, var)!r}" for var in self._repr_fields)
             + ")"
         )
 
     def runCommand(self, command: str) -> None:
         response = self._stub.runCommand(pb.CommandRequest(command=command))
-        raise_on_error(response)
+        if response.code:
+            raise_on_error(response)
+
+    def runCommands(self, commands: Iterable[str]) -> None:
+        """Run all commands with a single round-trip by sending them before waiting for answers.
+        Note, the server does not guarantee to execute them in the given order,
+        so use runCommand for commands that depend on each other, e.g., tp before kill.
+        """
+        prefix = self._command_prefix
+        futures = [
+            self._stub.runCommand.future(pb.CommandRequest(command=prefix + command))
+            for command in commands
+        ]
+        for future in futures:
+            response = future.result()
+            if response.code:
+                raise_on_error(response)
 
 
 class _EntityProvider(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def _get_or_create_entity(self, entity_id: str) -> Entity:
         raise NotImplementedError
 
+    def _get_or_create_entities(self, entity_ids: list[str]) -> list[Entity]:
+        return [self._get_or_create_entity(entity_id) for entity_id in entity_ids]
+
 
 class _PlayerProvider(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def _get_or_create_player(self, name: str) -> Player:
         raise NotImplementedError
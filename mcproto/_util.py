@@ -3,7 +3,7 @@ from __future__ import annotations
 import contextlib
 import threading
 import weakref
-from typing import Callable, Generator, Hashable, TypeAlias, TypeVar
+from typing import Callable, Generator, Hashable, Iterable, TypeAlias, TypeVar
 
 __all__ = ["ReentrantRWLock", "ThreadSafeSingeltonCache"]
 
@@ -187,7 +187,9 @@ class ThreadSafeSingeltonCache:
         Guarantees that a value with given key is a singleton in the entire program, even across multiple threads.
         """
         _sentinel = object()  # do not use None, as None could be a legit value in cache
-        strong_ref = self.get(key, _sentinel)
+        # fast path without lock: single dict lookups are atomic and a value is never replaced,
+        # for weakrefs get returns a strong reference (or default if the object died)
+        strong_ref = self._cache.get(key, _sentinel)
         if strong_ref is _sentinel:
             with self._lock.for_write():
                 # must check again as entry could have been created while waiting for write lock (race condition)
@@ -200,3 +202,29 @@ class ThreadSafeSingeltonCache:
                         strong_ref = self._default_factory(key)
                     self._cache[key] = strong_ref
         return strong_ref
+
+    def get_or_create_many(
+        self, keys: Iterable[Key], factory: Callable[[Key], Value] | None = None
+    ) -> list[Value]:
+        """Same as get_or_create but for many keys at once, returning values in the order of keys.
+        The lock is only aquired once for all keys (and once more if any values must be created),
+        instead of once per key.
+        """
+        keys = list(keys)
+        _sentinel = object()  # do not use None, as None could be a legit value in cache
+        values = [self._cache.get(key, _sentinel) for key in keys]  # lock free, see get_or_create
+        if any(value is _sentinel for value in values):
+            with self._lock.for_write():
+                for index, key in enumerate(keys):
+                    if values[index] is not _sentinel:
+                        continue
+                    # must check again as entry could have been created while waiting for write lock
+                    strong_ref = self._cache.get(key, _sentinel)
+                    if strong_ref is _sentinel:
+                        if factory is not None:
+                            strong_ref = factory(key)
+                        else:
+                            strong_ref = self._default_factory(key)
+                        self._cache[key] = strong_ref
+                    values[index] = strong_ref
+        return values
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import logging
+import threading
 import time
-from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Generator, Iterable
 
 from ._base import HasStub, _EntityProvider
 from ._types import COLOR
@@ -17,22 +21,81 @@ from .world import World, _WorldHub
 __all__ = ["Entity"]
 
 CACHE_ENTITY_TIME = 0.2
+# for this long after CACHE_ENTITY_TIME the cached values are still returned while they are
+# updated in the background, 0 always waits for the update
+CACHE_ENTITY_STALE_TIME = 0.0
 ALLOW_UNLOADED_ENTITY_OPS = True
 
+# runs the background updates of entities with a stale time, threads are only started on use
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mcproto-refresh")
+
+# 'hideParticles' argument of the effect command, indexed by whether particles are shown
+_HIDE_PARTICLES = ("true", "false")
+
 
 class Entity(HasStub):
+    __slots__ = (
+        "_worldhub",
+        "_id",
+        "_type",
+        "_update_deadline",
+        "_pos_deadline",
+        "_orientation_deadline",
+        "_world_deadline",
+        "_world",
+        "_x",
+        "_y",
+        "_z",
+        "_pitch",
+        "_yaw",
+        "_loaded",
+        "_loaded_deadline",
+        "_pb_update_requests",
+        "_command_prefix",
+        "_pending_request",
+        "_update_lock",
+        "__weakref__",  # required by weakref based entity cache
+    )
+    _not_found_code: int = pb.ENTITY_NOT_FOUND
+
     def __init__(self, stub: MinecraftStub, worldhub: _WorldHub, entity_id: str) -> None:
         super().__init__(stub)
         self._worldhub = worldhub
         self._id = entity_id
         self._type: str | None = None  # TODO: inject type from outside for now
 
-        self._update_ts: float = 0.0
+        self._update_deadline: float = 0.0  # time.monotonic() after which cache is stale
+        # values are also known after setting them, so they might stay valid for longer
+        self._pos_deadline: float = 0.0
+        self._orientation_deadline: float = 0.0
+        self._world_deadline: float = 0.0
         self._world: World = None
-        self._pos: Vec3 = Vec3()
+        # position is stored as raw coordinates, Vec3 is only built when pos is accessed
+        self._x: float = 0.0
+        self._y: float = 0.0
+        self._z: float = 0.0
         self._pitch: float = 0.0
         self._yaw: float = 0.0
         self._loaded: bool = False
+        self._loaded_deadline: float = 0.0  # same as _update_deadline but only for _loaded
+        # update requests without and with locations, built on first _update
+        self._pb_update_requests: tuple[pb.EntityRequest, pb.EntityRequest] | None = None
+        self._command_prefix = f"execute as {entity_id} at @s run "
+        self._pending_request: pb.Entity | None = None  # set while in batch()
+        self._update_lock = threading.Lock()
+
+    # the module settings are read on each use, so changing them at runtime takes effect
+    @property
+    def _cache_time(self) -> float:
+        return CACHE_ENTITY_TIME
+
+    @property
+    def _stale_time(self) -> float:
+        return CACHE_ENTITY_STALE_TIME
+
+    @property
+    def _allow_unloaded_ops(self) -> bool:
+        return ALLOW_UNLOADED_ENTITY_OPS
 
     @property
     def id(self) -> str:
@@ -52,65 +115,123 @@ class Entity(HasStub):
         return f"{self.__class__.__name__}(type=?, id={self.id})"
 
     def __eq__(self, __o: object) -> bool:
-        return isinstance(__o, type(self)) and self.id == __o.id
+        return __o.__class__ is self.__class__ and self._id == __o._id  # type: ignore
 
     def __gt__(self, __o: object) -> bool:
-        if not isinstance(__o, type(self)):
+        if __o.__class__ is not self.__class__:
             raise TypeError(
                 f"'>' not supported between instances of '{type(self)}' and '{type(__o)}'"
             )
-        return self.id > __o.id
+        return self._id > __o._id  # type: ignore
 
     def __hash__(self) -> int:
-        return hash((type(self), self.id))
+        # ids are unique on the server, entities of different types never share the same id
+        return hash(self._id)
 
     def _should_update(self) -> bool:
-        if time.time() - self._update_ts > CACHE_ENTITY_TIME:
-            return True
-        return False
-
-    def _inject_update(self, pb_entity: pb.Entity) -> bool:
-        assert pb_entity.id == self.id
-        if pb_entity.type:
+        return time.monotonic() >= self._update_deadline
+
+    def _update_on_check(self) -> None:
+        """Update if the cache expired, concurrent callers share a single update"""
+        if not self._should_update():
+            return
+        if self._stale_time and time.monotonic() < self._update_deadline + self._stale_time:
+            # serve the cached values, the lock is held until the background update is done
+            if not self._update_lock.acquire(blocking=False):
+                return  # the background update is already running
+            try:
+                _refresh_executor.submit(self._update_in_background)
+                return
+            except RuntimeError:
+                # the executor is shut down, e.g., in atexit handlers, so update right here
+                self._update_lock.release()
+            except BaseException:
+                self._update_lock.release()
+                raise
+        with self._update_lock:
+            # another thread might have finished the update while we waited for the lock
+            if self._should_update():
+                self._update()
+
+    def _update_in_background(self) -> None:
+        try:
+            self._update()
+        except Exception as e:
+            # the cache stays expired, so the next access past the stale time raises again
+            logging.debug(f"Entity: background update of {self._id} failed: {e!r}")
+        finally:
+            self._update_lock.release()
+
+    def _field_on_check(self, deadline: float) -> None:
+        """Same as _update_on_check but only for a value with its own deadline, e.g., pos"""
+        if time.monotonic() >= deadline:
+            self._update_on_check()
+
+    def _inject_update(self, pb_entity: pb.Entity | pb.Player) -> bool:
+        # the caller matches pb_entity to self by id or name, so it is not checked again here
+        if isinstance(pb_entity, pb.Entity) and pb_entity.type:  # players have no type field
             self._type = pb_entity.type
-        self._world = self._worldhub.getWorldByName(pb_entity.location.world.name)
-        self._pos = Vec3(
-            pb_entity.location.pos.x, pb_entity.location.pos.y, pb_entity.location.pos.z
-        )
-        self._pitch = pb_entity.location.orientation.pitch
-        self._yaw = pb_entity.location.orientation.yaw
-        self._update_ts = time.time()
+        deadline = time.monotonic() + self._cache_time
+        if pb_entity.HasField("location"):
+            location = pb_entity.location
+            pos, orientation = location.pos, location.orientation
+            self._world = self._worldhub.getWorldByName(location.world.name)
+            self._x, self._y, self._z = pos.x, pos.y, pos.z
+            self._pitch, self._yaw = orientation.pitch, orientation.yaw
+            self._update_deadline = deadline
+            self._pos_deadline = self._orientation_deadline = self._world_deadline = deadline
+        self._loaded_deadline = deadline
         self._loaded = True
         return True
 
-    def _update(self, allow_dead: bool = ALLOW_UNLOADED_ENTITY_OPS) -> bool:
-        response = self._stub.getEntities(
-            pb.EntityRequest(
-                specific=pb.EntityRequest.SpecificEntities(entities=[pb.Entity(id=self.id)]),
-                withLocations=True,
+    def _expire_cache(self) -> None:
+        """Get all values from the server on the next read, e.g., if a set was not confirmed"""
+        self._update_deadline = 0.0
+        self._pos_deadline = self._orientation_deadline = self._world_deadline = 0.0
+
+    def _cache_unloaded(self) -> None:
+        """Keep the unloaded state for the cache time, so polling it is not one request per read.
+        The other values are only kept if unloaded operations are allowed, otherwise the next
+        read asks the server again and raises."""
+        deadline = time.monotonic() + self._cache_time
+        self._loaded_deadline = deadline
+        if self._allow_unloaded_ops:
+            self._update_deadline = deadline
+
+    def _update(self, allow_dead: bool | None = None, with_locations: bool = True) -> bool:
+        if allow_dead is None:
+            allow_dead = self._allow_unloaded_ops
+        if self._pb_update_requests is None:
+            # the requests never change for this entity, so build them only once
+            specific = pb.EntityRequest.SpecificEntities(entities=[pb.Entity(id=self._id)])
+            self._pb_update_requests = (
+                pb.EntityRequest(specific=specific, withLocations=False),
+                pb.EntityRequest(specific=specific, withLocations=True),
             )
-        )
+        request = self._pb_update_requests[with_locations]
+        response = self._stub.getEntities(request)
         # getEntities does NOT raise ENTITY_NOT_FOUND if any or all specific entities are not found
-        raise_on_error(response.status)
+        if response.status.code:
+            raise_on_error(response.status)
         if len(response.entities) == 0:
             self._loaded = False
             if not allow_dead:
                 raise_on_error(pb.Status(code=pb.ENTITY_NOT_FOUND, extra=self.id))
+            self._cache_unloaded()
             return False
         else:
-            assert len(response.entities) == 1
-            e = response.entities[0]
-            return self._inject_update(e)
+            # only one entity was requested
+            return self._inject_update(response.entities[0])
 
     def runCommand(self, command: str) -> None:
-        command = f"execute as {self.id} at @s run " + command
-        return super().runCommand(command)
+        return super().runCommand(self._command_prefix + command)
 
     def kill(self) -> None:
         self.runCommand("kill")
 
     def remove(self) -> None:
         # TODO: implement natively
+        # kill only after the teleport is done, so nothing is dropped where the entity stood
         self.runCommand("tp ~ -50000 ~")
         self.kill()
 
@@ -118,12 +239,17 @@ class Entity(HasStub):
         self, distance: float, type: str | None = None, only_spawnable: bool = True
     ) -> list[Entity]:
         entities = self.world.getEntitiesAround(self.pos, distance, type, only_spawnable)
-        return [e for e in entities if e is not self]
+        # entities are singletons and appear at most once, the list is newly created for us
+        try:
+            entities.remove(self)
+        except ValueError:
+            pass
+        return entities
 
     def giveEffect(
         self, effect: str, seconds: int = 30, amplifier: int = 0, particles: bool = True
     ) -> None:
-        pbool = str(not bool(particles)).lower()
+        pbool = _HIDE_PARTICLES[bool(particles)]
         self.runCommand(f"effect give @s {effect} {int(seconds)} {amplifier} {pbool}")
 
     def replaceItem(self, where: str, item: str, amount: int = 1, nbt: NBT | None = None) -> None:
@@ -165,143 +291,252 @@ class Entity(HasStub):
 
     @property
     def loaded(self) -> bool:
-        if self._should_update():
-            self._update(allow_dead=True)
+        if time.monotonic() >= self._loaded_deadline:
+            # only liveness is needed, so do not let the server send the location
+            self._update(allow_dead=True, with_locations=False)
             # TODO: loaded being True does not give any guarantees
         return self._loaded
 
+    def _check_set_response(self, response: pb.Status) -> None:
+        code = response.code
+        if code and (not self._allow_unloaded_ops or code != self._not_found_code):
+            raise_on_error(response)
+
+    def _new_location_request(self) -> pb.Entity:
+        return pb.Entity(id=self._id)
+
+    def _send_location(self, request: pb.Entity) -> None:
+        self._worldhub._send_or_queue(self, self._stub.setEntity, request)
+
+    def _location_request(self) -> pb.Entity:
+        """Request to write location changes into, setters fill its location in place"""
+        pending = self._pending_request
+        return self._new_location_request() if pending is None else pending
+
+    def _set_location(self, request: pb.Entity) -> None:
+        if request is not self._pending_request:
+            self._send_location(request)
+
+    def _current_orientation(self) -> tuple[float, float]:
+        pending = self._pending_request
+        if pending is not None and pending.location.HasField("orientation"):
+            # not sent yet, so the server does not know about it
+            orientation = pending.location.orientation
+            return orientation.yaw, orientation.pitch
+        self._field_on_check(self._orientation_deadline)
+        return self._yaw, self._pitch
+
+    @contextmanager
+    def batch(self) -> Generator[Entity, None, None]:
+        """Collect all changes to pos, orientation (yaw, pitch, facing) and world made
+        within the 'with' block and send them in a single request at the end of the block, e.g.,
+        >>> with entity.batch():
+        >>>     entity.pos = Vec3(1, 2, 3)
+        >>>     entity.yaw = 90
+        If the block raises an exception, the collected changes are discarded.
+        Note, reading the properties within the block may return the old values of the server.
+        """
+        if self._pending_request is not None:
+            yield self  # nested, the outermost batch sends the changes
+            return
+        pending = self._pending_request = self._new_location_request()
+        try:
+            yield self
+        except BaseException:
+            # local values were changed, get them from server again
+            self._expire_cache()
+            raise
+        finally:
+            self._pending_request = None
+        if pending.HasField("location"):
+            try:
+                self._send_location(pending)
+            except BaseException:
+                # the setters already cached the values, which the server did not accept
+                self._expire_cache()
+                raise
+
+    def setLocation(
+        self,
+        pos: Vec3 | None = None,
+        yaw: float | None = None,
+        pitch: float | None = None,
+        world: World | str | None = None,
+    ) -> None:
+        """Set any of pos, yaw, pitch and world of the entity in a single request"""
+        with self.batch():
+            if pos is not None:
+                self.pos = pos
+            if yaw is not None and pitch is not None:
+                self.orientation = (yaw, pitch)
+            elif yaw is not None:
+                self.yaw = yaw
+            elif pitch is not None:
+                self.pitch = pitch
+            if world is not None:
+                self.world = world
+
     @property
     def pos(self) -> Vec3:
-        if self._should_update():
-            self._update()
-        return self._pos
+        self._field_on_check(self._pos_deadline)
+        return Vec3(self._x, self._y, self._z)
 
     @pos.setter
     def pos(self, pos: Vec3) -> None:
-        response = self._stub.setEntity(
-            pb.Entity(
-                id=self.id,
-                location=pb.EntityLocation(pos=pb.Vec3f(**pos.map(float).asdict())),
-            )
-        )
-        if not ALLOW_UNLOADED_ENTITY_OPS or response.code != pb.ENTITY_NOT_FOUND:
-            raise_on_error(response)
-        self._pos = pos
+        x, y, z = float(pos.x), float(pos.y), float(pos.z)
+        request = self._location_request()
+        target = request.location.pos
+        target.x, target.y, target.z = x, y, z
+        self._set_location(request)
+        self._x, self._y, self._z = x, y, z
+        self._pos_deadline = time.monotonic() + self._cache_time
 
     @property
     def pitch(self) -> float:
-        if self._should_update():
-            self._update()
+        self._field_on_check(self._orientation_deadline)
         return self._pitch
 
     @pitch.setter
     def pitch(self, pitch: float) -> None:
-        if self._should_update():
-            self._update()  # due to yaw also being set
-        response = self._stub.setEntity(
-            pb.Entity(
-                id=self.id,
-                location=pb.EntityLocation(
-                    orientation=pb.EntityOrientation(yaw=self._yaw, pitch=float(pitch))
-                ),
-            )
-        )
-        if not ALLOW_UNLOADED_ENTITY_OPS or response.code != pb.ENTITY_NOT_FOUND:
-            raise_on_error(response)
-        self._pitch = pitch
+        yaw, _ = self._current_orientation()  # due to yaw also being set
+        self.orientation = (yaw, pitch)
 
     @property
     def yaw(self) -> float:
-        if self._should_update():
-            self._update()
+        self._field_on_check(self._orientation_deadline)
         return self._yaw
 
     @yaw.setter
     def yaw(self, yaw: float) -> None:
-        if self._should_update():
-            self._update()  # due to pitch also being set
-        response = self._stub.setEntity(
-            pb.Entity(
-                id=self.id,
-                location=pb.EntityLocation(
-                    orientation=pb.EntityOrientation(yaw=float(yaw), pitch=self._pitch)
-                ),
-            )
-        )
-        if not ALLOW_UNLOADED_ENTITY_OPS or response.code != pb.ENTITY_NOT_FOUND:
-            raise_on_error(response)
-        self._yaw = yaw
+        _, pitch = self._current_orientation()  # due to pitch also being set
+        self.orientation = (yaw, pitch)
 
     @property
     def orientation(self) -> tuple[float, float]:
-        if self._should_update():
-            self._update()
+        self._field_on_check(self._orientation_deadline)
         return (self._yaw, self._pitch)
 
     @orientation.setter
     def orientation(self, orientation: tuple[float, float]) -> None:
-        response = self._stub.setEntity(
-            pb.Entity(
-                id=self.id,
-                location=pb.EntityLocation(
-                    orientation=pb.EntityOrientation(
-                        yaw=float(orientation[0]), pitch=float(orientation[1])
-                    )
-                ),
-            ),
-        )
-        if not ALLOW_UNLOADED_ENTITY_OPS or response.code != pb.ENTITY_NOT_FOUND:
-            raise_on_error(response)
-        self._yaw, self._pitch = orientation[:2]
+        yaw, pitch = float(orientation[0]), float(orientation[1])
+        request = self._location_request()
+        target = request.location.orientation
+        target.yaw, target.pitch = yaw, pitch
+        self._set_location(request)
+        self._yaw, self._pitch = yaw, pitch
+        # the server now has exactly these values, no need to get them for following yaw/pitch sets
+        self._orientation_deadline = time.monotonic() + self._cache_time
 
     @property
     def world(self) -> World:
-        if self._should_update():
-            self._update()
-            if self._world is None:
-                return self._worldhub.worlds[0]  # TODO: return _DefaultWorld?
+        self._field_on_check(self._world_deadline)
+        if self._world is None:
+            return self._worldhub.worlds[0]  # TODO: return _DefaultWorld?
         return self._world
 
     @world.setter
     def world(self, world: World | str) -> None:
-        if isinstance(world, str):
-            newworld = self._worldhub.getWorldByKey(world)
-        elif isinstance(world, World):
-            newworld = self._worldhub.getWorldByName(world.name)
-            if newworld is not world:
+        if isinstance(world, World):
+            # worlds of this server are created with the hub as their entity provider
+            if world._entity_provider is not self._worldhub:
                 raise ValueError("World and player are not from same server")
+            newworld = world
+        elif isinstance(world, str):
+            newworld = self._worldhub.getWorldByKey(world)
         else:
             raise TypeError("World should be of type World or str")
-        response = self._stub.setEntity(
-            pb.Entity(
-                id=self.id,
-                location=pb.EntityLocation(world=pb.World(name=newworld.name)),
-            ),
-        )
-        if not ALLOW_UNLOADED_ENTITY_OPS or response.code != pb.ENTITY_NOT_FOUND:
-            raise_on_error(response)
+        request = self._location_request()
+        request.location.world.name = newworld.name
+        self._set_location(request)
         self._world = newworld
+        self._world_deadline = time.monotonic() + self._cache_time
+
+
+def _update_many(
+    stub: MinecraftStub, entities: Iterable[Entity], allow_dead: bool | None = None
+) -> None:
+    """Update all given entities whose cache expired with a single getEntities request,
+    and all given players with a single getPlayers request"""
+    from .player import Player, _update_many_players  # player imports this module
+
+    stale: list[Entity] = []
+    players: list[Player] = []
+    for entity in entities:
+        if isinstance(entity, Player):
+            players.append(entity)
+        elif type(entity) is not Entity:
+            # other subclasses have their own update endpoint
+            entity._update_on_check()
+        elif entity._should_update():
+            stale.append(entity)
+    try:
+        if stale:
+            response = stub.getEntities(
+                pb.EntityRequest(
+                    specific=pb.EntityRequest.SpecificEntities(
+                        entities=[pb.Entity(id=entity.id) for entity in stale]
+                    ),
+                    withLocations=True,
+                )
+            )
+            # getEntities does NOT raise ENTITY_NOT_FOUND if any or all specific entities are
+            # not found
+            raise_on_error(response.status)
+            _inject_many(stale, {e.id: e for e in response.entities}, allow_dead)
+    finally:
+        if players:
+            _update_many_players(stub, players)
+
+
+def _inject_many(
+    stale: Iterable[Entity],
+    found: dict[str, pb.Entity] | dict[str, pb.Player],
+    allow_dead: bool | None = None,
+) -> None:
+    """Inject the answer of a request for many entities or players, found by id or name.
+    Every entity is injected or marked unloaded before the first error is raised"""
+    error: pb.Status | None = None
+    for entity in stale:
+        pb_entity = found.get(entity._id)
+        if pb_entity is not None:
+            entity._inject_update(pb_entity)
+            continue
+        entity._loaded = False
+        if entity._allow_unloaded_ops if allow_dead is None else allow_dead:
+            entity._cache_unloaded()
+        elif error is None:
+            error = pb.Status(code=entity._not_found_code, extra=entity._id)
+    if error is not None:
+        raise_on_error(error)
 
 
 class _EntityCache(_WorldHub, HasStub, _EntityProvider):
     def __init__(self, stub: MinecraftStub) -> None:
         super().__init__(stub)
-        self._entity_cache = ThreadSafeSingeltonCache(
-            partial(Entity, stub, self), use_weakref=True
-        )
+        self._entity_cache = ThreadSafeSingeltonCache(self._make_entity, use_weakref=True)
+
+    def _make_entity(self, entity_id: str) -> Entity:
+        return Entity(self._stub, self, entity_id)
 
     def _get_or_create_entity(self, entity_id: str) -> Entity:
         return self._entity_cache.get_or_create(entity_id)
 
+    def _get_or_create_entities(self, entity_ids: list[str]) -> list[Entity]:
+        return self._entity_cache.get_or_create_many(entity_ids)
+
     def getEntityById(self, entity_id: str) -> Entity:
         entity = self._get_or_create_entity(entity_id)
         entity._update()
         return entity
 
+    def refreshEntities(self, entities: Iterable[Entity]) -> None:
+        """Update the cached state of all given entities at once, which is much faster than
+        accessing the entities one by one if many of them have to be updated"""
+        _update_many(self._stub, entities)
 
-# if __name__ == "__main__":
-#     from functools import partial
 
+# if __name__ == "__main__":
+#
 #     test_stub_1 = object()
 #     test_stub_2 = object()
 #     E1 = partial(Entity, test_stub_1)
@@ -115,15 +115,14 @@ exc = {
 
 
 def exception_from_status(status: pb.Status) -> Exception:
-    if status.code in exc.keys():
-        e, default, default_extra = exc[status.code]
-        print("Status Extra:", status.extra)
-        if status.extra:
-            return e(default_extra.format(status.extra))
-        else:
-            return e(default)
-    else:
+    entry = exc.get(status.code)
+    if entry is None:
         return NotImplementedError(f"Der Fehlercode {status.code} wurde nocht nicht implementiert")
+    e, default, default_extra = entry
+    if status.extra:
+        return e(default_extra.format(status.extra))
+    else:
+        return e(default)
 
 
 def raise_on_error(status: pb.Status) -> None:
@@ -1,6 +1,17 @@
+import logging as _logging
 import sys as _sys
 from pathlib import Path as _Path
 
+from google.protobuf.internal import api_implementation as _api_implementation
+
+# the pure python implementation of protobuf is many times slower than the native ones (upb/cpp)
+if _api_implementation.Type() == "python":
+    # a named logger does not configure the root logger, which minecraft.py does
+    _logging.getLogger(__name__).warning(
+        "mcproto: protobuf uses its slow pure python implementation, "
+        "install protobuf>=4.21 and unset PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION for upb"
+    )
+
 # add current directory to import path
 # (because the other files here are auto generated and do not use relative imports)
 _current = _Path(__file__).parent.resolve()
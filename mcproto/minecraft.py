@@ -19,11 +19,22 @@ __all__ = ["Minecraft"]
 logging.basicConfig(format="%(levelname)s:%(message)s", level=logging.INFO)
 # logging.basicConfig(format="%(levelname)s:%(message)s", level=logging.DEBUG)
 
+# keepalive interval matches the default minimum ping interval of grpc-java servers,
+# pinging more often gets the connection closed with "too_many_pings"
+_CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 5 * 60 * 1000),
+    ("grpc.keepalive_timeout_ms", 20 * 1000),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.max_send_message_length", 64 << 20),
+    ("grpc.max_receive_message_length", 64 << 20),
+    ("grpc.use_local_subchannel_pool", 1),
+]
+
 
 class Minecraft(_DefaultWorld, _EventHandler, _PlayerCache, _EntityCache, _WorldHub, HasStub):
     def __init__(self, host: str = "localhost", port: int = 1789) -> None:
         self._addr = (host, port)
-        self._channel = grpc.insecure_channel(f"{host}:{port}")
+        self._channel = grpc.insecure_channel(f"{host}:{port}", options=_CHANNEL_OPTIONS)
         stub = MinecraftStub(self._channel)
         super().__init__(stub)
         atexit.register(self._cleanup)
@@ -1,29 +1,52 @@
 from __future__ import annotations
 
 import time
-from functools import partial
-from typing import Literal
+from typing import Iterable, Literal
 
 from ._base import HasStub, _PlayerProvider
 from ._util import ThreadSafeSingeltonCache
-from .entity import Entity
+from .entity import Entity, _inject_many
 from .exception import raise_on_error
 from .mcpb import MinecraftStub
 from .mcpb import minecraft_pb2 as pb
 from .nbt import NBT
-from .vec3 import Vec3
-from .world import World, _WorldHub
+from .world import _WorldHub
 
 CACHE_PLAYER_TIME = 0.2
+# see CACHE_ENTITY_STALE_TIME
+CACHE_PLAYER_STALE_TIME = 0.0
 ALLOW_OFFLINE_PLAYER_OPS = True
 
+# requests are only read when sent, so the same message can be shared by all calls
+_ALL_PLAYERS_REQUEST = pb.PlayerRequest(withLocations=True)
+
+_GAMEMODE_COMMANDS = {
+    mode: f"gamemode {mode}" for mode in ("adventure", "creative", "spectator", "survival")
+}
+
 
 class Player(Entity, HasStub):
+    __slots__ = ()  # all state is kept in the slots of Entity
+
+    _not_found_code: int = pb.PLAYER_NOT_FOUND
+
     def __init__(self, stub: MinecraftStub, worldhub: _WorldHub, name: str) -> None:
         if not isinstance(name, str):
             raise TypeError("Player name must be of type str")
         super().__init__(stub, worldhub, name)
 
+    @property
+    def _cache_time(self) -> float:
+        return CACHE_PLAYER_TIME
+
+    @property
+    def _stale_time(self) -> float:
+        return CACHE_PLAYER_STALE_TIME
+
+    @property
+    def _allow_unloaded_ops(self) -> bool:
+        return ALLOW_OFFLINE_PLAYER_OPS
+
     @property
     def name(self) -> str:
         return self._id
@@ -34,8 +57,9 @@ class Player(Entity, HasStub):
 
     @property
     def online(self) -> bool:
-        if self._should_update():
-            self._update(allow_offline=True)
+        if time.monotonic() >= self._loaded_deadline:
+            # only presence is needed, so do not let the server send the location
+            self._update(allow_offline=True, with_locations=False)
             # TODO: online being True does not give any guarantees
         return self._loaded
 
@@ -46,33 +70,23 @@ class Player(Entity, HasStub):
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(name={self.name})"
 
-    def _should_update(self) -> bool:
-        if time.time() - self._update_ts > CACHE_PLAYER_TIME:
-            return True
-        return False
-
-    def _inject_update(self, pb_player: pb.Player) -> bool:
-        assert pb_player.name == self.name
-        self._world = self._worldhub.getWorldByName(pb_player.location.world.name)
-        self._pos = Vec3(
-            pb_player.location.pos.x, pb_player.location.pos.y, pb_player.location.pos.z
-        )
-        self._pitch = pb_player.location.orientation.pitch
-        self._yaw = pb_player.location.orientation.yaw
-        self._update_ts = time.time()
-        self._loaded = True
-        return True
-
-    def _update(self, allow_offline: bool = ALLOW_OFFLINE_PLAYER_OPS) -> bool:
-        response = self._stub.getPlayers(pb.PlayerRequest(names=[self.name], withLocations=True))
+    def _update(self, allow_offline: bool | None = None, with_locations: bool = True) -> bool:
+        if allow_offline is None:
+            allow_offline = self._allow_unloaded_ops
+        if self._pb_update_requests is None:
+            self._pb_update_requests = (
+                pb.PlayerRequest(names=[self._id], withLocations=False),
+                pb.PlayerRequest(names=[self._id], withLocations=True),
+            )
+        response = self._stub.getPlayers(self._pb_update_requests[with_locations])
         if allow_offline and response.status.code == pb.PLAYER_NOT_FOUND:
-            self._loaded = False  # do not update self._update_ts on purpose
+            self._loaded = False
+            self._cache_unloaded()
             return False
         raise_on_error(response.status)
         if len(response.players) > 0:
-            assert len(response.players) == 1
-            p = response.players[0]
-            return self._inject_update(p)
+            # only one player was requested
+            return self._inject_update(response.players[0])
         else:
             raise RuntimeError("Player could not be updated and no error was raised by response")
 
@@ -82,7 +96,7 @@ class Player(Entity, HasStub):
 
     # functions only for players
     def gamemode(self, mode: Literal["adventure", "creative", "spectator", "survival"]) -> None:
-        self.runCommand(f"gamemode {mode}")
+        self.runCommand(_GAMEMODE_COMMANDS.get(mode) or f"gamemode {mode}")
 
     def adventure(self) -> None:
         self.gamemode("adventure")
@@ -118,126 +132,40 @@ class Player(Entity, HasStub):
     def deop(self) -> None:
         HasStub.runCommand(self, f"deop {self.name}")
 
-    # properties that have different stub entpoints than entity
-    @property
-    def pos(self) -> Vec3:
-        if self._should_update():
-            self._update()
-        return self._pos
-
-    @pos.setter
-    def pos(self, pos: Vec3) -> None:
-        response = self._stub.setPlayer(
-            pb.Player(
-                name=self.name,
-                location=pb.EntityLocation(pos=pb.Vec3f(**pos.map(float).asdict())),
-            )
-        )
-        if not ALLOW_OFFLINE_PLAYER_OPS or response.code != pb.PLAYER_NOT_FOUND:
-            raise_on_error(response)
-        self._pos = pos
+    # location is set via different stub endpoint than entity
+    def _new_location_request(self) -> pb.Player:
+        return pb.Player(name=self._id)
 
-    @property
-    def pitch(self) -> float:
-        if self._should_update():
-            self._update()
-        return self._pitch
-
-    @pitch.setter
-    def pitch(self, pitch: float) -> None:
-        if self._should_update():
-            self._update()  # due to yaw also being set
-        response = self._stub.setPlayer(
-            pb.Player(
-                name=self.name,
-                location=pb.EntityLocation(
-                    orientation=pb.EntityOrientation(yaw=self._yaw, pitch=float(pitch))
-                ),
-            )
-        )
-        if not ALLOW_OFFLINE_PLAYER_OPS or response.code != pb.PLAYER_NOT_FOUND:
-            raise_on_error(response)
-        self._pitch = pitch
+    def _send_location(self, request: pb.Player) -> None:
+        self._worldhub._send_or_queue(self, self._stub.setPlayer, request)
 
-    @property
-    def yaw(self) -> float:
-        if self._should_update():
-            self._update()
-        return self._yaw
-
-    @yaw.setter
-    def yaw(self, yaw: float) -> None:
-        if self._should_update():
-            self._update()  # due to pitch also being set
-        response = self._stub.setPlayer(
-            pb.Player(
-                name=self.name,
-                location=pb.EntityLocation(
-                    orientation=pb.EntityOrientation(yaw=float(yaw), pitch=self._pitch)
-                ),
-            )
-        )
-        if not ALLOW_OFFLINE_PLAYER_OPS or response.code != pb.PLAYER_NOT_FOUND:
-            raise_on_error(response)
-        self._yaw = yaw
 
-    @property
-    def orientation(self) -> tuple[float, float]:
-        if self._should_update():
-            self._update()
-        return (self._yaw, self._pitch)
-
-    @orientation.setter
-    def orientation(self, orientation: tuple[float, float]) -> None:
-        response = self._stub.setPlayer(
-            pb.Player(
-                name=self.name,
-                location=pb.EntityLocation(
-                    orientation=pb.EntityOrientation(
-                        yaw=float(orientation[0]), pitch=float(orientation[1])
-                    )
-                ),
-            ),
-        )
-        if not ALLOW_OFFLINE_PLAYER_OPS or response.code != pb.PLAYER_NOT_FOUND:
-            raise_on_error(response)
-        self._yaw, self._pitch = orientation[:2]
-
-    @property
-    def world(self) -> World:
-        if self._should_update():
-            self._update()
-            if self._world is None:
-                return self._worldhub.worlds[0]  # TODO: return _DefaultWorld?
-        return self._world
-
-    @world.setter
-    def world(self, world: World | str) -> None:
-        if isinstance(world, str):
-            newworld = self._worldhub.getWorldByKey(world)
-        elif isinstance(world, World):
-            newworld = self._worldhub.getWorldByName(world.name)
-            if newworld is not world:
-                raise ValueError("World and player are not from same server")
-        else:
-            raise TypeError("World should be of type World or str")
-        response = self._stub.setPlayer(
-            pb.Player(
-                name=self.name,
-                location=pb.EntityLocation(world=pb.World(name=newworld.name)),
-            ),
-        )
-        if not ALLOW_OFFLINE_PLAYER_OPS or response.code != pb.PLAYER_NOT_FOUND:
-            raise_on_error(response)
-        self._world = newworld
+def _update_many_players(stub: MinecraftStub, players: Iterable[Player]) -> None:
+    """Update all given players whose cache expired with a single getPlayers request"""
+    stale = [player for player in players if player._should_update()]
+    if not stale:
+        return
+    response = stub.getPlayers(
+        pb.PlayerRequest(names=[player.name for player in stale], withLocations=True)
+    )
+    if response.status.code == pb.PLAYER_NOT_FOUND:
+        # at least one of the players is offline, let each player handle that on its own
+        for player in stale:
+            player._update_on_check()
+        return
+    raise_on_error(response.status)
+    _inject_many(stale, {p.name: p for p in response.players})
 
 
 class _PlayerCache(_WorldHub, HasStub, _PlayerProvider):
     def __init__(self, stub: MinecraftStub) -> None:
         super().__init__(stub)
-        self._player_cache = ThreadSafeSingeltonCache(partial(Player, self._stub, self))
+        self._player_cache = ThreadSafeSingeltonCache(self._make_player)
         self._default_player: Player | None = None
 
+    def _make_player(self, name: str) -> Player:
+        return Player(self._stub, self, name)
+
     def _get_or_create_player(self, name: str) -> Player:
         return self._player_cache.get_or_create(name)
 
@@ -246,23 +174,36 @@ class _PlayerCache(_WorldHub, HasStub, _PlayerProvider):
 
     def getPlayers(self, names: list[str] | None = None) -> list[Player]:
         if names is None:
-            response = self._stub.getPlayers(pb.PlayerRequest())
+            response = self._stub.getPlayers(_ALL_PLAYERS_REQUEST)
         else:
-            response = self._stub.getPlayers(pb.PlayerRequest(names=names))
+            response = self._stub.getPlayers(pb.PlayerRequest(names=names, withLocations=True))
         raise_on_error(response.status)
-        players = [self._get_or_create_player(player.name) for player in response.players]
+        players = []
+        for pb_player in response.players:
+            player = self._get_or_create_player(pb_player.name)
+            # the locations were sent anyway, so fill the cache of the players with them
+            player._inject_update(pb_player)
+            players.append(player)
         if self._default_player is None and players:
             self._default_player = players[0]
         return players
 
+    def refreshPlayers(self, players: Iterable[Player]) -> None:
+        """Update the cached state of all given players at once, which is much faster than
+        accessing the players one by one if many of them have to be updated"""
+        _update_many_players(self._stub, players)
+
     def getPlayerNames(self) -> list[str]:
         players = self.getPlayers()
         return [player.name for player in players]
 
     def getPlayer(self, name: str | None = None) -> Player:
         if name is None:
-            if self._default_player:
-                name = self._default_player.name
+            default = self._default_player
+            if default is not None:
+                if default.online:  # answered from the cache while it is fresh
+                    return default
+                name = default.name  # the server raises if the player is still offline
             else:
                 players = self.getPlayers()
                 if players:
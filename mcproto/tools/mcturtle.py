@@ -1,9 +1,16 @@
 from __future__ import annotations
 
-from time import sleep
+import math
+from time import monotonic, sleep
 
 from .. import Minecraft, Vec3, World
 
+# the server updates the world 20 times per second, setting blocks more often is not visible
+_TICK_TIME = 0.05
+# Vec3 is immutable, so the starting directions can be shared by all turtles
+_EAST_UNIT = Vec3().east(1)
+_UP_UNIT = Vec3().up(1)
+
 
 def _sign(num: int | float) -> float:
     return 1.0 if num >= 0.0 else -1.0
@@ -44,11 +51,13 @@ class Turtle:
 
         if self._world is None:
             self._set_block = self._mc.setBlock
+            self._set_block_list = self._mc.setBlockList
         else:
             self._set_block = self._world.setBlock
+            self._set_block_list = self._world.setBlockList
 
-        self._dir_front: Vec3 = Vec3().east(1)
-        self._dir_up: Vec3 = Vec3().up(1)
+        self._dir_front: Vec3 = _EAST_UNIT
+        self._dir_up: Vec3 = _UP_UNIT
         self._head: str = "diamond_block"
         self._body: str = "black_wool"
         self._speed: float = 1
@@ -94,8 +103,9 @@ class Turtle:
 
     def _rotate(self, angle: float, to: Vec3) -> None:
         k = self._dir_front.cross(to).norm()
-        self._dir_front = self._dir_front.rotate(k, angle).norm()
-        self._dir_up = self._dir_up.rotate(k, angle).norm()
+        phi = math.radians(angle)
+        self._dir_front = self._dir_front.rotate_rad(k, phi).norm()
+        self._dir_up = self._dir_up.rotate_rad(k, phi).norm()
 
     def _paint_body(self) -> None:
         if self._pendown:
@@ -103,6 +113,12 @@ class Turtle:
         elif self._show_head:
             self._set_block("air", self._body_pos)
 
+    def _paint_body_list(self, positions: list[Vec3]) -> None:
+        if self._pendown:
+            self._set_block_list(self._body, positions)
+        elif self._show_head:
+            self._set_block_list("air", positions)
+
     def _paint_head(self) -> None:
         if self._show_head:
             self._set_block(self._head, self._body_pos)
@@ -130,12 +146,38 @@ class Turtle:
         return self
 
     def forward(self, by: float) -> Turtle:
-        wait = 1.0 / self._speed
-        for _ in range(int(abs(by))):
-            self._paint_body()
-            self._pos = self._pos + (self._dir_front * _sign(by))
+        step = self._dir_front * _sign(by)
+        axis = step.round()
+        if (step - axis).length() < 1e-9:
+            # along an axis, integer steps do not accumulate the float error of the rotations
+            step = axis
+        steps = int(abs(by))
+        if not self._pendown and not self._show_head:
+            # nothing is painted, so there is nothing to animate either
+            self._pos = self._pos + step * steps
+            return self
+        # all steps of one server tick are set with a single request, which looks the same
+        per_tick = max(1, int(self._speed * _TICK_TIME))
+        # sleep until the time each group is due, so the time of the requests is not added on top
+        start, done = monotonic(), 0
+        while steps > 0:
+            count = min(per_tick, steps)
+            body: list[Vec3] = []
+            pos = self._pos  # local in the loop, same as self._pos and self._body_pos
+            for _ in range(count):
+                body_pos = pos.floor()
+                # diagonal steps can stay within the same block, do not send it twice
+                if not body or body[-1] != body_pos:
+                    body.append(body_pos)
+                pos = pos + step
+            self._pos = pos
+            steps -= count
+            self._paint_body_list(body)
             self._paint_head()
-            sleep(wait)
+            done += count
+            remaining = start + done / self._speed - monotonic()
+            if remaining > 0:
+                sleep(remaining)
         return self
 
     def backward(self, by: float) -> Turtle:
@@ -167,11 +209,13 @@ class Turtle:
         return self
 
     def hidehead(self) -> Turtle:
-        self._show_head = False
-        self._set_block("air", self._body_pos)
+        if self._show_head:
+            self._show_head = False
+            self._set_block("air", self._body_pos)
         return self
 
     def showhead(self) -> Turtle:
+        # always paint, so head(block).showhead() shows a new head block right away
         self._show_head = True
         self._set_block(self._head, self._body_pos)
         return self
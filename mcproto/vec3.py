@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import math
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass
 from numbers import Number
 from typing import Any, Callable, Iterator, Union
 
@@ -12,8 +12,15 @@ _NumVec = Union["Vec3", _NumType]
 
 __all__ = ["Vec3"]
 
+# labels of the negative and positive direction along the x, y and z axis
+_DIRECTION_LABELS: tuple[tuple[DIRECTION, DIRECTION], ...] = (
+    ("west", "east"),
+    ("down", "up"),
+    ("north", "south"),
+)
 
-@dataclass(frozen=True, eq=True, order=True, repr=True)
+
+@dataclass(frozen=True, eq=True, order=True, repr=True, slots=True)
 class Vec3:
     x: float = 0
     y: float = 0
@@ -24,9 +31,14 @@ class Vec3:
         """Build direction unit-vector from yaw and pitch.
         yaw: -180..179.99 (-180/180 north, -90 east, 0 south, 90 west)
         pitch -90..90 (-90 up, 0 straight, 90 down)"""
-        yawed = Vec3().south().rotate(Vec3().down(), yaw)
-        pitched = yawed.rotate(yawed.cross(Vec3().down()), pitch)
-        return pitched  # .norm()  # already normed
+        # closed form of rotating south around down by yaw, then around the side axis by pitch
+        yaw_rad, pitch_rad = math.radians(yaw), math.radians(pitch)
+        cos_pitch = math.cos(pitch_rad)
+        return cls(
+            -math.sin(yaw_rad) * cos_pitch,
+            -math.sin(pitch_rad),
+            math.cos(yaw_rad) * cos_pitch,
+        )  # already normed
 
     def yaw_pitch(self) -> tuple[float, float]:
         """Return the yaw and pitch value from self as directional vector.
@@ -39,20 +51,21 @@ class Vec3:
         return yaw, pitch
 
     def __add__(self, v: _NumVec) -> Vec3:
-        if isinstance(v, Number):
-            return Vec3(self.x + v, self.y + v, self.z + v)
+        # check Vec3 first, the isinstance check against the abstract Number is slower
         if isinstance(v, Vec3):
             return Vec3(self.x + v.x, self.y + v.y, self.z + v.z)
+        if isinstance(v, Number):
+            return Vec3(self.x + v, self.y + v, self.z + v)
         return NotImplemented
 
     def __radd__(self, v: _NumVec) -> Vec3:
         return self + v
 
     def __sub__(self, v: _NumVec) -> Vec3:
-        if isinstance(v, Number):
-            return Vec3(self.x - v, self.y - v, self.z - v)
         if isinstance(v, Vec3):
             return Vec3(self.x - v.x, self.y - v.y, self.z - v.z)
+        if isinstance(v, Number):
+            return Vec3(self.x - v, self.y - v, self.z - v)
         return NotImplemented
 
     def __rsub__(self, v: _NumVec) -> Vec3:
@@ -103,7 +116,7 @@ class Vec3:
             return self.map(lambda v: round(v, ndigits))
 
     def __floor__(self) -> Vec3:
-        return self.map(math.floor)
+        return Vec3(math.floor(self.x), math.floor(self.y), math.floor(self.z))
 
     def __ceil__(self) -> Vec3:
         return self.map(math.ceil)
@@ -126,13 +139,15 @@ class Vec3:
 
     def __abs__(self) -> float:
         """Return (absolute) length of vector"""
-        return math.hypot(*self)
+        x, y, z = self.x, self.y, self.z
+        return math.sqrt(x * x + y * y + z * z)
 
     def length(self) -> float:
         return self.__abs__()
 
     def distance(self, v: Vec3) -> float:
-        return (self - v).length()
+        dx, dy, dz = self.x - v.x, self.y - v.y, self.z - v.z
+        return math.sqrt(dx * dx + dy * dy + dz * dz)
 
     def dot(self, v: Vec3) -> float:
         return self.x * v.x + self.y * v.y + self.z * v.z
@@ -162,11 +177,16 @@ class Vec3:
 
     def rotate_rad(self, v: Vec3, phi: float) -> Vec3:
         """Rotate self around vector v by phi degree radians - Rodrigues rotation"""
-        v = v.norm()
-        return (
-            self * math.cos(phi)
-            + v.cross(self) * math.sin(phi)
-            + v * v.dot(self) * (1.0 - math.cos(phi))
+        # written out per component, this avoids creating the intermediate vectors
+        length = v.length()
+        nx, ny, nz = v.x / length, v.y / length, v.z / length
+        x, y, z = self.x, self.y, self.z
+        cos, sin = math.cos(phi), math.sin(phi)
+        k = (nx * x + ny * y + nz * z) * (1.0 - cos)
+        return Vec3(
+            x * cos + (ny * z - nz * y) * sin + nx * k,
+            y * cos + (nz * x - nx * z) * sin + ny * k,
+            z * cos + (nx * y - ny * x) * sin + nz * k,
         )
 
     def round(self, ndigits: int = 0) -> Vec3:
@@ -182,35 +202,30 @@ class Vec3:
         return self.__trunc__()
 
     def asdict(self) -> dict[str, _NumType]:
-        return asdict(self)
+        # dataclasses.asdict would deepcopy each field, the coordinates are plain numbers
+        return {"x": self.x, "y": self.y, "z": self.z}
 
     def closest_axis(self) -> Vec3:
-        greatest = max(self.map(abs))
-        if abs(self.x) == greatest:
+        index = self._closest_axis_index()
+        if index == 0:
             return Vec3(x=self.x)
-        elif abs(self.y) == greatest:
+        elif index == 1:
             return Vec3(y=self.y)
-        elif abs(self.z) == greatest:
-            return Vec3(z=self.z)
-        else:
-            return Vec3()
+        return Vec3(z=self.z)
+
+    def _closest_axis_index(self) -> int:
+        # on a tie, x is preferred over y and y over z
+        ax, ay, az = abs(self.x), abs(self.y), abs(self.z)
+        if ax >= ay and ax >= az:
+            return 0
+        return 1 if ay >= az else 2
 
     def direction_label(self) -> DIRECTION:
-        axis = self.closest_axis()
-        if axis.x > 0:
-            return "east"
-        elif axis.x < 0:
-            return "west"
-        elif axis.y > 0:
-            return "up"
-        elif axis.y < 0:
-            return "down"
-        elif axis.z > 0:
-            return "south"
-        elif axis.z < 0:
-            return "north"
-        else:
+        index = self._closest_axis_index()
+        value = (self.x, self.y, self.z)[index]
+        if value == 0:
             return "east"
+        return _DIRECTION_LABELS[index][value > 0]
 
     def cardinal_label(self) -> CARDINAL:
         return self.withY(0).direction_label()  # type: ignore
@@ -1,5 +1,15 @@
 from __future__ import annotations
 
+import math
+import threading
+from collections import deque
+from contextlib import contextmanager
+from itertools import islice, product
+from typing import TYPE_CHECKING, Callable, Generator, Iterable, Sequence
+
+import grpc
+from google.protobuf.message import Message
+
 from . import entity
 from ._base import HasStub, _EntityProvider
 from ._types import CARDINAL, COLOR, DIRECTION
@@ -8,7 +18,24 @@ from .mcpb import MinecraftStub
 from .mcpb import minecraft_pb2 as pb
 from .vec3 import Vec3
 
+if TYPE_CHECKING:
+    import numpy
+
 MAX_BLOCKS = 50000  # TODO: replace with block stream
+# chunks of setBlockList that are sent before waiting for the answer of the oldest one
+_MAX_PENDING_CHUNKS = 4
+# same for the single block requests of getBlockList
+_MAX_PENDING_BLOCK_REQUESTS = 256
+
+
+def _pb_vec3(pos: Vec3) -> pb.Vec3:
+    # floor each coordinate directly, without an intermediate Vec3 and dict per block
+    return pb.Vec3(x=math.floor(pos.x), y=math.floor(pos.y), z=math.floor(pos.z))
+
+
+def _block_type(response: pb.BlockResponse) -> str:
+    raise_on_error(response.status)
+    return response.info.blockType
 
 
 class _DefaultWorld(HasStub, _EntityProvider):
@@ -48,42 +75,76 @@ class _DefaultWorld(HasStub, _EntityProvider):
         return self.getHighestPos(x, z).y  # type: ignore
 
     def getBlock(self, pos: Vec3) -> str:
-        response = self._stub.getBlock(
-            pb.BlockRequest(world=self._pb_world, pos=pb.Vec3(**pos.floor().asdict()))
-        )
-        raise_on_error(response.status)
-        return response.info.blockType
+        response = self._stub.getBlock(pb.BlockRequest(world=self._pb_world, pos=_pb_vec3(pos)))
+        return _block_type(response)
 
     # TODO: differentiate between block type and Block
     # def getBlockWithData(self, pos: Vec3) -> Block:
     #     raise NotImplementedError
 
-    def getBlockList(self, positions: list[Vec3]) -> list[str]:
+    def getBlockList(self, positions: Iterable[Vec3]) -> list[str]:
         # TODO: natively support this operation
-        return [self.getBlock(pos) for pos in positions]
+        # keep a window of requests in flight instead of waiting for each answer in turn
+        blocktypes: list[str] = []
+        pending: deque[grpc.Future] = deque()
+        try:
+            for pos in positions:
+                if len(pending) >= _MAX_PENDING_BLOCK_REQUESTS:
+                    blocktypes.append(_block_type(pending.popleft().result()))
+                pending.append(
+                    self._stub.getBlock.future(
+                        pb.BlockRequest(world=self._pb_world, pos=_pb_vec3(pos))
+                    )
+                )
+            while pending:
+                blocktypes.append(_block_type(pending.popleft().result()))
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+        return blocktypes
 
     def setBlock(self, blocktype: str, pos: Vec3) -> None:
         response = self._stub.setBlock(
             pb.Block(
                 world=self._pb_world,
                 info=pb.BlockInfo(blockType=blocktype),
-                pos=pb.Vec3(**pos.floor().asdict()),
+                pos=_pb_vec3(pos),
             )
         )
         raise_on_error(response)
 
-    def setBlockList(self, blocktype: str, positions: list[Vec3]) -> None:
-        for chunk in (
-            positions[index : index + MAX_BLOCKS] for index in range(0, len(positions), MAX_BLOCKS)
-        ):
-            response = self._stub.setBlocks(
-                pb.Blocks(
-                    world=self._pb_world,
-                    info=pb.BlockInfo(blockType=blocktype),
-                    pos=[pb.Vec3(**pos.floor().asdict()) for pos in chunk],
-                )
-            )
-            raise_on_error(response)
+    def setBlockList(self, blocktype: str, positions: Iterable[Vec3]) -> None:
+        pending: deque[grpc.Future] = deque()
+        # take one chunk at a time, so positions can be a generator of any size
+        it = iter(positions)
+        try:
+            while chunk := list(islice(it, MAX_BLOCKS)):
+                request = pb.Blocks(world=self._pb_world, info=pb.BlockInfo(blockType=blocktype))
+                # filling the added messages is much faster than keyword construction of pb.Vec3
+                add = request.pos.add
+                for pos in chunk:
+                    pb_pos = add()
+                    pb_pos.x = math.floor(pos.x)
+                    pb_pos.y = math.floor(pos.y)
+                    pb_pos.z = math.floor(pos.z)
+                if len(pending) >= _MAX_PENDING_CHUNKS:
+                    raise_on_error(pending.popleft().result())
+                pending.append(self._stub.setBlocks.future(request))
+            while pending:
+                raise_on_error(pending.popleft().result())
+        except Exception:
+            # the chunks in flight are set by the server anyway, wait for them before raising
+            for future in pending:
+                try:
+                    future.result()
+                except Exception:
+                    pass  # the first error is raised
+            raise
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
 
     def setBlockCube(self, blocktype: str, pos1: Vec3, pos2: Vec3) -> None:
         response = self._stub.setBlockCube(
@@ -91,8 +152,8 @@ class _DefaultWorld(HasStub, _EntityProvider):
                 world=self._pb_world,
                 info=pb.BlockInfo(blockType=blocktype),
                 pos=[
-                    pb.Vec3(**pos1.floor().asdict()),
-                    pb.Vec3(**pos2.floor().asdict()),
+                    _pb_vec3(pos1),
+                    _pb_vec3(pos2),
                 ],
             )
         )
@@ -143,12 +204,12 @@ class _DefaultWorld(HasStub, _EntityProvider):
                         raise ValueError("Open slices are forbidden")
                     for el in spos:
                         el.indices(0)  # only to raise Errors such as float or zero checks
-                    positions = [
+                    positions = (
                         Vec3(x, y, z)
-                        for x in range(spos[0].start, spos[0].stop, spos[0].step or 1)
-                        for y in range(spos[1].start, spos[1].stop, spos[1].step or 1)
-                        for z in range(spos[2].start, spos[2].stop, spos[2].step or 1)
-                    ]  # TODO: make setBlockList to take Iterable instead of list
+                        for x, y, z in product(
+                            *(range(el.start, el.stop, el.step or 1) for el in spos)
+                        )
+                    )
                     return self.setBlockList(blocktype, positions)
                 else:
                     raise TypeError("Expected tuple with int or slice types")
@@ -159,9 +220,9 @@ class _DefaultWorld(HasStub, _EntityProvider):
             x, y, z = pos  # attempt to unpack
             return self.setBlock(blocktype, Vec3(x, y, z))
 
-    def _fetch_entities(
+    def _request_entities(
         self, include_non_spawnable: bool, with_locations: bool, entity_type: str
-    ) -> list[entity.Entity]:
+    ) -> Sequence[pb.Entity]:
         request = pb.EntityRequest(
             worldwide=pb.EntityRequest.WorldEntities(
                 world=self._pb_world, type=entity_type, includeNotSpawnable=include_non_spawnable
@@ -170,25 +231,37 @@ class _DefaultWorld(HasStub, _EntityProvider):
         )
         response = self._stub.getEntities(request)
         raise_on_error(response.status)
-        entities = []
-        for e in response.entities:
-            if include_non_spawnable and e.type == "player":
-                # TODO: players are also included in getEntities(includeNotSpawnable=True) call
-                continue
-            nativeE = self._get_or_create_entity(e.id)
+        if include_non_spawnable:
+            # TODO: players are also included in getEntities(includeNotSpawnable=True) call
+            return [e for e in response.entities if e.type != "player"]
+        return response.entities  # no need to copy the repeated field
+
+    def _fetch_entities(
+        self, include_non_spawnable: bool, with_locations: bool, entity_type: str
+    ) -> list[entity.Entity]:
+        pb_entities = self._request_entities(include_non_spawnable, with_locations, entity_type)
+        return self._entities_from_pb(pb_entities, with_locations)
+
+    def _entities_from_pb(
+        self, pb_entities: Sequence[pb.Entity], with_locations: bool
+    ) -> list[entity.Entity]:
+        entities = self._get_or_create_entities([e.id for e in pb_entities])
+        for nativeE, e in zip(entities, pb_entities):
             if with_locations:
                 nativeE._inject_update(e)
             else:
                 # update only type
                 nativeE._type = e.type
-            entities.append(nativeE)
         return entities
 
     def spawnEntity(self, type: str, pos: Vec3) -> entity.Entity:
         response = self._stub.spawnEntity(
             pb.Entity(
                 type=type,
-                location=pb.EntityLocation(world=self._pb_world, pos=pb.Vec3f(**pos.asdict())),
+                location=pb.EntityLocation(
+                    world=self._pb_world,
+                    pos=pb.Vec3f(x=float(pos.x), y=float(pos.y), z=float(pos.z)),
+                ),
             )
         )
         raise_on_error(response.status)
@@ -199,16 +272,44 @@ class _DefaultWorld(HasStub, _EntityProvider):
     def getEntities(
         self, type: str | None = None, only_spawnable: bool = True
     ) -> list[entity.Entity]:
-        return self._fetch_entities(not only_spawnable, False, type if type else "")
+        # with locations, so that accessing the entities afterwards does not need more requests
+        return self._fetch_entities(not only_spawnable, True, type if type else "")
 
     def getEntitiesAround(
         self, pos: Vec3, distance: float, type: str | None = None, only_spawnable: bool = True
     ) -> list[entity.Entity]:
-        entities = self._fetch_entities(not only_spawnable, True, type if type else "")
-        return [e for e in entities if pos.distance(e.pos) <= distance]
+        if distance < 0:
+            return []
+        # filter the raw positions first, only entities in range are created and updated
+        x, y, z = pos.x, pos.y, pos.z
+        max_squared = distance * distance
+        in_range = []
+        for e in self._request_entities(not only_spawnable, True, type if type else ""):
+            epos = e.location.pos
+            dx, dy, dz = epos.x - x, epos.y - y, epos.z - z
+            if dx * dx + dy * dy + dz * dz <= max_squared:
+                in_range.append(e)
+        return self._entities_from_pb(in_range, True)
+
+    def getEntityPositions(
+        self, type: str | None = None, only_spawnable: bool = True
+    ) -> tuple[list[str], numpy.ndarray]:
+        """Return the ids of all entities and their positions as NumPy array of shape (N, 3).
+        No Entity objects are created, which makes this much faster than getEntitiesAround
+        for large numbers of entities, e.g., to filter them by distance with NumPy first.
+        Use getEntityById to get the Entity for an id. Requires numpy to be installed."""
+        import numpy as np
+
+        pb_entities = self._request_entities(not only_spawnable, True, type if type else "")
+        positions = np.empty((len(pb_entities), 3), dtype=np.float64)
+        for index, e in enumerate(pb_entities):
+            pos = e.location.pos
+            positions[index] = pos.x, pos.y, pos.z
+        return [e.id for e in pb_entities], positions
 
     def removeEntities(self, type: str | None = None) -> None:
         # TODO: support natively
+        # kill only after the teleport is done, see Entity.remove
         if type is None:
             self.runCommand("tp @e[type=!player] 0 -50000 0")
             self.runCommand("kill @e[type=!player]")
@@ -222,13 +323,13 @@ class _DefaultWorld(HasStub, _EntityProvider):
         # pos2 inclusive
         pos1, pos2 = pos1.map_pairwise(min, pos2), pos1.map_pairwise(max, pos2)
         pos1, pos2 = pos1.floor(), pos2.floor()
-        return [
-            [
-                [self.getBlock(Vec3(x, y, z)) for z in range(pos1.z, pos2.z + 1)]
-                for y in range(pos1.y, pos2.y + 1)
-            ]
-            for x in range(pos1.x, pos2.x + 1)
-        ]
+        xrange = range(pos1.x, pos2.x + 1)
+        yrange = range(pos1.y, pos2.y + 1)
+        zrange = range(pos1.z, pos2.z + 1)
+        blocks = iter(
+            self.getBlockList([Vec3(x, y, z) for x in xrange for y in yrange for z in zrange])
+        )
+        return [[[next(blocks) for _ in zrange] for _ in yrange] for _ in xrange]
 
     def pasteBlockCube(
         self,
@@ -273,16 +374,20 @@ class _DefaultWorld(HasStub, _EntityProvider):
         xrange = range(xlen) if xstride >= 0 else range(xlen - 1, -1, -1)
         yrange = range(ylen) if ystride >= 0 else range(ylen - 1, -1, -1)
         zrange = range(zlen) if zstride >= 0 else range(zlen - 1, -1, -1)
-        for xindex, x in enumerate(xrange):
-            for yindex, y in enumerate(yrange):
-                for zindex, z in enumerate(zrange):
-                    index = x * abs(xstride) + y * abs(ystride) + z * abs(zstride)
-                    assert (
-                        0 <= index < len(blocks)
-                    ), f"{x=} {y=}, {z=} {xstride=} {ystride=} {zstride=} {index=} len={len(blocks)}"
-                    self.setBlock(
-                        blocks[index], Vec3(pos.x + xindex, pos.y + yindex, pos.z + zindex)
-                    )
+        # offsets into blocks per target coordinate, computed once per axis instead of per block
+        xoffsets = [(px, x * abs(xstride)) for px, x in enumerate(xrange, pos.x)]
+        yoffsets = [(py, y * abs(ystride)) for py, y in enumerate(yrange, pos.y)]
+        zoffsets = [(pz, z * abs(zstride)) for pz, z in enumerate(zrange, pos.z)]
+        # set the blocks of one type with one request per layer, bottom to top, so that
+        # supporting blocks are placed before the sand, torches, etc. resting on them
+        for py, yoffset in yoffsets:
+            positions: dict[str, list[Vec3]] = {}
+            for px, xoffset in xoffsets:
+                offset = xoffset + yoffset
+                for pz, zoffset in zoffsets:
+                    positions.setdefault(blocks[offset + zoffset], []).append(Vec3(px, py, pz))
+            for blocktype, block_positions in positions.items():
+                self.setBlockList(blocktype, block_positions)
 
     def placeBed(self, pos: Vec3, direction: CARDINAL = "east", color: COLOR = "red") -> None:
         pos = pos.floor()
@@ -309,13 +414,19 @@ class World(_DefaultWorld, HasStub, _EntityProvider):
         self._name = name
         self._key = key
         self._entity_provider = entity_provider
+        self._command_prefix = f"execute in {key} run "
+        # protobuf copies message fields on assignment, so all requests can share this message
+        self._pb_world_message = pb.World(name=name)
 
     def _get_or_create_entity(self, entity_id: str):
         return self._entity_provider._get_or_create_entity(entity_id)
 
+    def _get_or_create_entities(self, entity_ids: list[str]):
+        return self._entity_provider._get_or_create_entities(entity_ids)
+
     @property
     def _pb_world(self) -> pb.World:
-        return pb.World(name=self.name)
+        return self._pb_world_message
 
     @property
     def name(self) -> str:
@@ -343,14 +454,53 @@ class World(_DefaultWorld, HasStub, _EntityProvider):
         return f"{self.__class__.__name__}(key={self.key})"
 
     def runCommand(self, command: str) -> None:
-        command = f"execute in {self.key} run " + command
-        return super().runCommand(command)
+        return super().runCommand(self._command_prefix + command)
 
 
 class _WorldHub(HasStub, _EntityProvider):
     def __init__(self, stub: MinecraftStub) -> None:
         super().__init__(stub)
         self._worlds_by_name: dict[str, World] = dict()
+        # per thread list of (future, entity) of requests sent in batch()
+        self._batch = threading.local()
+
+    def _send_or_queue(self, ent: entity.Entity, method: Callable, request: Message) -> None:
+        queued = getattr(self._batch, "queued", None)
+        if queued is None:
+            ent._check_set_response(method(request))
+        else:
+            queued.append((method.future(request), ent))
+
+    @contextmanager
+    def batch(self) -> Generator[None, None, None]:
+        """Within the 'with' block, changes to entities and players (pos, orientation, world)
+        made by this thread are sent without waiting for the server to answer, e.g.,
+        >>> with mc.batch():
+        >>>     for entity in entities:
+        >>>         entity.pos += Vec3().up()
+        The answers of all requests are awaited and checked for errors at the end of the block.
+        The first error is raised, unless the block itself raised an exception.
+        """
+        if getattr(self._batch, "queued", None) is not None:
+            yield  # nested, the outermost batch waits for the answers
+            return
+        queued: list[tuple[grpc.Future, entity.Entity]] = []
+        self._batch.queued = queued
+        errors: list[Exception] = []
+        try:
+            yield
+        finally:
+            self._batch.queued = None
+            # requests were already sent, so wait for them even if the block raised
+            for future, ent in queued:
+                try:
+                    ent._check_set_response(future.result())
+                except Exception as e:
+                    # the setters already cached the new values, which the server did not confirm
+                    ent._expire_cache()
+                    errors.append(e)
+        if errors:
+            raise errors[0]
 
     def refreshWorlds(self, remake: bool = False) -> None:
         """Refresh worlds if you, for example, load a new one with Multiverse Core Plugin"""
@@ -398,11 +548,14 @@ class _WorldHub(HasStub, _EntityProvider):
 
     def getWorldByName(self, name: str) -> World:
         """World name == Folder name, eg. 'world', 'world_the_nether' or 'world_the_end'"""
-        if not self._worlds_by_name:
+        world = self._worlds_by_name.get(name)
+        if world is None:
+            # worlds not fetched yet or a new world was loaded since
             self.refreshWorlds()
-        if name not in self._worlds_by_name:
-            raise_on_error(pb.Status(code=pb.WORLD_NOT_FOUND, extra="name=" + name))
-        return self._worlds_by_name[name]
+            world = self._worlds_by_name.get(name)
+            if world is None:
+                raise_on_error(pb.Status(code=pb.WORLD_NOT_FOUND, extra="name=" + name))
+        return world
 
     def getWorldByKey(self, key: str) -> World:
         """World key == Minecraft key, eg. 'the_nether' or 'minecraft:the_nether'"""
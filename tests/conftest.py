@@ -0,0 +1,53 @@
+from typing import Callable
+from unittest.mock import MagicMock
+
+import pytest
+
+from mcproto.entity import _EntityCache
+from mcproto.mcpb import MinecraftStub
+from mcproto.mcpb import minecraft_pb2 as pb
+from mcproto.player import _PlayerCache
+
+
+class Cache(_PlayerCache, _EntityCache):
+    """Entity, player and world access as in Minecraft, but without a channel"""
+
+
+@pytest.fixture
+def make_cache() -> Callable[[], Cache]:
+    def make() -> Cache:
+        stub = MagicMock(spec=MinecraftStub(MagicMock()))
+        stub.accessWorlds.return_value = pb.WorldResponse(
+            worlds=[pb.World(name="world", info=pb.WorldInfo(key="minecraft:overworld"))]
+        )
+        return Cache(stub)
+
+    return make
+
+
+@pytest.fixture
+def cache(make_cache: Callable[[], Cache]) -> Cache:
+    return make_cache()
+
+
+@pytest.fixture
+def pb_entity() -> Callable[..., pb.Entity]:
+    def make(entity_id: str, x: float = 0, y: float = 0, z: float = 0) -> pb.Entity:
+        return pb.Entity(
+            id=entity_id,
+            type="pig",
+            location=pb.EntityLocation(world=pb.World(name="world"), pos=pb.Vec3f(x=x, y=y, z=z)),
+        )
+
+    return make
+
+
+@pytest.fixture
+def pb_player() -> Callable[..., pb.Player]:
+    def make(name: str, x: float = 0, y: float = 0, z: float = 0) -> pb.Player:
+        return pb.Player(
+            name=name,
+            location=pb.EntityLocation(world=pb.World(name="world"), pos=pb.Vec3f(x=x, y=y, z=z)),
+        )
+
+    return make
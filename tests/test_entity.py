@@ -0,0 +1,312 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from mcproto import MCProtoFehler, Vec3
+from mcproto.entity import _update_many
+from mcproto.mcpb import minecraft_pb2 as pb
+
+
+def test_refresh_entities_single_request(cache, pb_entity):
+    entities = [cache._get_or_create_entity(str(i)) for i in range(3)]
+    cache._stub.getEntities.return_value = pb.EntityResponse(
+        entities=[pb_entity("0", 1, 2, 3), pb_entity("2", 4, 5, 6)]
+    )
+
+    cache.refreshEntities(entities)
+
+    cache._stub.getEntities.assert_called_once()
+    request = cache._stub.getEntities.call_args.args[0]
+    assert [e.id for e in request.specific.entities] == ["0", "1", "2"]
+    assert entities[0].pos == Vec3(1, 2, 3)
+    assert entities[2].pos == Vec3(4, 5, 6)
+    assert not entities[1]._loaded
+    assert cache._stub.getEntities.call_count == 1  # cached values were used
+
+
+def test_refresh_entities_skips_fresh(cache, pb_entity):
+    entity = cache._get_or_create_entity("0")
+    cache._stub.getEntities.return_value = pb.EntityResponse(entities=[pb_entity("0")])
+    cache.refreshEntities([entity])
+    cache.refreshEntities([entity])
+    cache._stub.getEntities.assert_called_once()
+
+
+def test_refresh_entities_sends_players_in_single_request(cache, pb_entity, pb_player):
+    entity = cache._get_or_create_entity("0")
+    players = [cache.getOfflinePlayer(name) for name in "ab"]
+    cache._stub.getEntities.return_value = pb.EntityResponse(entities=[pb_entity("0")])
+    cache._stub.getPlayers.return_value = pb.PlayerResponse(
+        players=[pb_player("a", 1, 2, 3), pb_player("b", 4, 5, 6)]
+    )
+
+    cache.refreshEntities([players[0], entity, players[1]])
+
+    cache._stub.getEntities.assert_called_once()
+    cache._stub.getPlayers.assert_called_once()
+    assert list(cache._stub.getPlayers.call_args.args[0].names) == ["a", "b"]
+    assert players[1].pos == Vec3(4, 5, 6)
+
+
+def test_refresh_entities_injects_all_before_raising(cache, pb_entity):
+    entities = [cache._get_or_create_entity(str(i)) for i in range(3)]
+    cache._stub.getEntities.return_value = pb.EntityResponse(entities=[pb_entity("2", 1, 2, 3)])
+
+    with pytest.raises(MCProtoFehler):
+        _update_many(cache._stub, entities, allow_dead=False)
+
+    assert not entities[0]._loaded and not entities[1]._loaded
+    assert entities[2].pos == Vec3(1, 2, 3)
+    assert cache._stub.getEntities.call_count == 1  # injected after the first missing entity
+
+
+def test_entity_has_no_instance_dict(cache):
+    entity = cache._get_or_create_entity("0")
+    assert not hasattr(entity, "__dict__")
+    with pytest.raises(AttributeError):
+        entity.some_attribute = 1  # type: ignore
+
+
+def test_loaded_does_not_request_location(cache, pb_entity):
+    entity = cache._get_or_create_entity("0")
+    cache._stub.getEntities.return_value = pb.EntityResponse(entities=[pb.Entity(id="0")])
+    assert entity.loaded
+    request = cache._stub.getEntities.call_args.args[0]
+    assert not request.withLocations
+    assert entity._should_update()  # location is still unknown
+
+    cache._stub.getEntities.return_value = pb.EntityResponse(entities=[pb_entity("0", 1, 2, 3)])
+    assert entity.pos == Vec3(1, 2, 3)
+    assert entity.loaded
+    assert cache._stub.getEntities.call_count == 2
+
+
+def test_batch_sends_single_request(cache, pb_entity):
+    entity = cache._get_or_create_entity("0")
+    cache._stub.getEntities.return_value = pb.EntityResponse(entities=[pb_entity("0")])
+    cache._stub.setEntity.return_value = pb.Status()
+
+    with entity.batch():
+        entity.pos = Vec3(1, 2, 3)
+        entity.yaw = 90
+        entity.pitch = 0
+        assert not cache._stub.setEntity.called
+
+    cache._stub.setEntity.assert_called_once()
+    request = cache._stub.setEntity.call_args.args[0]
+    assert request.id == "0"
+    assert request.location.pos == pb.Vec3f(x=1, y=2, z=3)
+    assert request.location.orientation == pb.EntityOrientation(yaw=90, pitch=0)
+    assert not request.location.HasField("world")
+
+
+def test_batch_discards_changes_on_exception(cache):
+    entity = cache._get_or_create_entity("0")
+    with pytest.raises(ValueError):
+        with entity.batch():
+            entity.pos = Vec3(1, 2, 3)
+            raise ValueError()
+    assert not cache._stub.setEntity.called
+    assert entity._should_update()
+
+
+def test_batch_discards_changes_on_rejected_request(cache, pb_entity):
+    entity = cache._get_or_create_entity("0")
+    cache._stub.setEntity.return_value = pb.Status(code=pb.MISSING_ARGUMENT)
+    with pytest.raises(MCProtoFehler):
+        with entity.batch():
+            entity.pos = Vec3(1, 2, 3)
+    cache._stub.getEntities.return_value = pb.EntityResponse(entities=[pb_entity("0", 4, 5, 6)])
+    assert entity.pos == Vec3(4, 5, 6)
+    cache._stub.getEntities.assert_called_once()
+
+
+def test_set_location(cache):
+    entity = cache._get_or_create_entity("0")
+    cache._stub.setEntity.return_value = pb.Status()
+    entity.setLocation(pos=Vec3(1, 2, 3), yaw=10, pitch=20, world="overworld")
+    cache._stub.setEntity.assert_called_once()
+    location = cache._stub.setEntity.call_args.args[0].location
+    assert location.pos == pb.Vec3f(x=1, y=2, z=3)
+    assert location.orientation == pb.EntityOrientation(yaw=10, pitch=20)
+    assert location.world.name == "world"
+
+
+def test_hub_batch_does_not_wait_for_answers(cache):
+    entities = [cache._get_or_create_entity(str(i)) for i in range(3)]
+    future = MagicMock()
+    future.result.return_value = pb.Status()
+    cache._stub.setEntity.future.return_value = future
+
+    with cache.batch():
+        for entity in entities:
+            entity.pos = Vec3(1, 2, 3)
+        assert not future.result.called
+
+    assert not cache._stub.setEntity.called
+    assert cache._stub.setEntity.future.call_count == 3
+    assert future.result.call_count == 3
+
+
+def test_hub_batch_raises_errors_at_end(cache, pb_entity):
+    entity = cache._get_or_create_entity("0")
+    future = MagicMock()
+    future.result.return_value = pb.Status(code=pb.MISSING_ARGUMENT)
+    cache._stub.setEntity.future.return_value = future
+
+    with pytest.raises(MCProtoFehler):
+        with cache.batch():
+            entity.pos = Vec3(1, 2, 3)
+
+    # the failed value is not served from the cache
+    cache._stub.getEntities.return_value = pb.EntityResponse(entities=[pb_entity("0", 4, 5, 6)])
+    assert entity.pos == Vec3(4, 5, 6)
+    cache._stub.getEntities.assert_called_once()
+
+
+def test_hub_batch_does_not_mask_exception_of_block(cache):
+    entity = cache._get_or_create_entity("0")
+    future = MagicMock()
+    future.result.return_value = pb.Status(code=pb.MISSING_ARGUMENT)
+    cache._stub.setEntity.future.return_value = future
+
+    with pytest.raises(ZeroDivisionError):
+        with cache.batch():
+            entity.pos = Vec3(1, 2, 3)
+            1 / 0
+    future.result.assert_called_once()
+
+
+@pytest.mark.timeout(3)
+def test_concurrent_access_updates_once(cache, pb_entity):
+    entity = cache._get_or_create_entity("0")
+
+    def slow_response(request):
+        time.sleep(0.2)
+        return pb.EntityResponse(entities=[pb_entity("0", 1, 2, 3)])
+
+    cache._stub.getEntities.side_effect = slow_response
+    threads = [threading.Thread(target=lambda: entity.pos) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cache._stub.getEntities.assert_called_once()
+
+
+def test_set_yaw_then_pitch_updates_once(cache, pb_entity):
+    entity = cache._get_or_create_entity("0")
+    cache._stub.getEntities.return_value = pb.EntityResponse(entities=[pb_entity("0")])
+    cache._stub.setEntity.return_value = pb.Status()
+    entity.yaw = 90
+    entity._update_deadline = 0.0  # expire the cache of the other values
+    entity.pitch = 45
+    assert entity.orientation == (90, 45)
+    cache._stub.getEntities.assert_called_once()
+    assert cache._stub.setEntity.call_count == 2
+
+
+def test_read_after_set_does_not_update(cache):
+    entity = cache._get_or_create_entity("0")
+    cache._stub.setEntity.return_value = pb.Status()
+    entity.pos = Vec3(1, 2, 3)
+    entity.world = "overworld"
+    assert entity.pos == Vec3(1, 2, 3)
+    assert entity.world.name == "world"
+    cache._stub.getEntities.assert_not_called()
+
+
+def test_stale_read_updates_in_background(cache, pb_entity, monkeypatch):
+    monkeypatch.setattr("mcproto.entity.CACHE_ENTITY_STALE_TIME", 10.0)
+    entity = cache._get_or_create_entity("0")
+    entity._inject_update(pb_entity("0", 1, 2, 3))
+    entity._update_deadline = entity._pos_deadline = time.monotonic() - 1.0
+
+    answer = threading.Event()
+
+    def get_entities(request):
+        answer.wait(timeout=2)
+        return pb.EntityResponse(entities=[pb_entity("0", 4, 5, 6)])
+
+    cache._stub.getEntities.side_effect = get_entities
+    assert entity.pos == Vec3(1, 2, 3)  # returned without waiting for the server
+    assert entity.pos == Vec3(1, 2, 3)
+    answer.set()
+    with entity._update_lock:  # held until the background update is done
+        pass
+    assert entity.pos == Vec3(4, 5, 6)
+    cache._stub.getEntities.assert_called_once()
+
+
+def test_stale_read_after_executor_shutdown_updates_synchronously(cache, pb_entity, monkeypatch):
+    monkeypatch.setattr("mcproto.entity.CACHE_ENTITY_STALE_TIME", 10.0)
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.shutdown()
+    monkeypatch.setattr("mcproto.entity._refresh_executor", executor)
+    entity = cache._get_or_create_entity("0")
+    entity._inject_update(pb_entity("0", 1, 2, 3))
+    entity._update_deadline = entity._pos_deadline = time.monotonic() - 1.0
+
+    cache._stub.getEntities.return_value = pb.EntityResponse(entities=[pb_entity("0", 4, 5, 6)])
+    assert entity.pos == Vec3(4, 5, 6)
+    assert not entity._update_lock.locked()
+    cache._stub.getEntities.assert_called_once()
+
+
+def test_set_world_from_other_server(cache, make_cache):
+    other = make_cache()
+    entity = cache._get_or_create_entity("0")
+    cache._stub.setEntity.return_value = pb.Status()
+    entity.world = cache.overworld
+    cache._stub.setEntity.assert_called_once()
+    with pytest.raises(ValueError):
+        entity.world = other.overworld
+
+
+def test_run_commands_does_not_wait_in_between(cache):
+    entity = cache._get_or_create_entity("0")
+    future = MagicMock()
+    future.result.return_value = pb.Status()
+    cache._stub.runCommand.future.return_value = future
+    entity.runCommands(["say a", "say b"])
+    commands = [c.args[0].command for c in cache._stub.runCommand.future.call_args_list]
+    assert commands == [entity._command_prefix + "say a", entity._command_prefix + "say b"]
+    assert future.result.call_count == 2
+    cache._stub.runCommand.assert_not_called()
+
+
+def test_cache_time_can_be_changed_at_runtime(cache, pb_entity, monkeypatch):
+    entity = cache._get_or_create_entity("0")
+    cache._stub.getEntities.return_value = pb.EntityResponse(entities=[pb_entity("0")])
+    monkeypatch.setattr("mcproto.entity.CACHE_ENTITY_TIME", 0.0)
+    entity.pos
+    entity.pos
+    assert cache._stub.getEntities.call_count == 2
+
+
+def test_unloaded_read_raises_after_loaded_if_not_allowed(cache, monkeypatch):
+    monkeypatch.setattr("mcproto.entity.ALLOW_UNLOADED_ENTITY_OPS", False)
+    entity = cache._get_or_create_entity("0")
+    cache._stub.getEntities.return_value = pb.EntityResponse()
+    assert not entity.loaded
+    assert not entity.loaded
+    cache._stub.getEntities.assert_called_once()
+    with pytest.raises(MCProtoFehler):
+        entity.pos
+
+
+def test_remove_teleports_before_kill(cache):
+    entity = cache._get_or_create_entity("0")
+    order = []
+
+    def run_command(request: pb.CommandRequest) -> pb.Status:
+        order.append(request.command)
+        return pb.Status()
+
+    cache._stub.runCommand.side_effect = run_command
+    entity.remove()
+    assert order == ["execute as 0 at @s run tp ~ -50000 ~", "execute as 0 at @s run kill"]
+    cache._stub.runCommand.future.assert_not_called()
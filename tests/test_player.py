@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from mcproto import MCProtoFehler, Vec3
+from mcproto.mcpb import minecraft_pb2 as pb
+
+
+def test_get_players_fills_cache(cache, pb_player):
+    cache._stub.getPlayers.return_value = pb.PlayerResponse(
+        players=[pb_player("a", 1, 2, 3), pb_player("b", 4, 5, 6)]
+    )
+    a, b = cache.getPlayers()
+    assert a.pos == Vec3(1, 2, 3)
+    assert b.pos == Vec3(4, 5, 6)
+    cache._stub.getPlayers.assert_called_once()
+
+
+def test_refresh_players_single_request(cache, pb_player):
+    players = [cache.getOfflinePlayer(name) for name in "abc"]
+    cache._stub.getPlayers.return_value = pb.PlayerResponse(
+        players=[pb_player("a", 1, 2, 3), pb_player("c", 4, 5, 6)]
+    )
+
+    cache.refreshPlayers(players)
+
+    cache._stub.getPlayers.assert_called_once()
+    request = cache._stub.getPlayers.call_args.args[0]
+    assert list(request.names) == ["a", "b", "c"]
+    assert players[0].pos == Vec3(1, 2, 3)
+    assert players[2].pos == Vec3(4, 5, 6)
+    assert not players[1]._loaded
+    cache._stub.getPlayers.assert_called_once()  # cached values were used
+
+
+def test_set_location_single_request(cache):
+    player = cache.getOfflinePlayer("a")
+    cache._stub.setPlayer.return_value = pb.Status()
+    player.setLocation(Vec3(1, 2, 3), yaw=90, pitch=0)
+    cache._stub.setPlayer.assert_called_once()
+    cache._stub.getPlayers.assert_not_called()
+    location = cache._stub.setPlayer.call_args.args[0].location
+    assert location.HasField("orientation") and location.orientation.yaw == 90
+    assert player.pos == Vec3(1, 2, 3)
+
+
+def test_online_does_not_request_location(cache, pb_player):
+    player = cache.getOfflinePlayer("a")
+    cache._stub.getPlayers.return_value = pb.PlayerResponse(players=[pb.Player(name="a")])
+    assert player.online
+    assert not cache._stub.getPlayers.call_args.args[0].withLocations
+    assert player.online
+    cache._stub.getPlayers.assert_called_once()
+
+    cache._stub.getPlayers.return_value = pb.PlayerResponse(players=[pb_player("a", 1, 2, 3)])
+    assert player.pos == Vec3(1, 2, 3)
+    assert cache._stub.getPlayers.call_args.args[0].withLocations
+
+
+def test_player_has_no_instance_dict(make_cache):
+    player = make_cache().getOfflinePlayer("a")
+    assert not hasattr(player, "__dict__")
+
+
+def test_offline_state_is_cached(cache):
+    player = cache.getOfflinePlayer("a")
+    cache._stub.getPlayers.return_value = pb.PlayerResponse(
+        status=pb.Status(code=pb.PLAYER_NOT_FOUND)
+    )
+    assert not player.online
+    assert not player.online
+    cache._stub.getPlayers.assert_called_once()
+
+
+def test_default_player_uses_cache(cache, pb_player):
+    cache._stub.getPlayers.return_value = pb.PlayerResponse(players=[pb_player("a")])
+    player = cache.getPlayer()
+    assert cache.getPlayer() is player
+    cache._stub.getPlayers.assert_called_once()
+
+
+def test_offline_ops_can_be_disallowed_at_runtime(cache, monkeypatch):
+    player = cache.getOfflinePlayer("a")
+    cache._stub.setPlayer.return_value = pb.Status(code=pb.PLAYER_NOT_FOUND)
+    player.pos = Vec3(1, 2, 3)  # allowed by default
+    monkeypatch.setattr("mcproto.player.ALLOW_OFFLINE_PLAYER_OPS", False)
+    with pytest.raises(MCProtoFehler):
+        player.pos = Vec3(1, 2, 3)
+
+
+def test_stale_player_read_updates_in_background(cache, pb_player, monkeypatch):
+    monkeypatch.setattr("mcproto.player.CACHE_PLAYER_STALE_TIME", 10.0)
+    player = cache.getOfflinePlayer("a")
+    player._inject_update(pb_player("a", 1, 2, 3))
+    player._update_deadline = player._pos_deadline = time.monotonic() - 1.0
+
+    answer = threading.Event()
+
+    def get_players(request):
+        answer.wait(timeout=2)
+        return pb.PlayerResponse(players=[pb_player("a", 4, 5, 6)])
+
+    cache._stub.getPlayers.side_effect = get_players
+    assert player.pos == Vec3(1, 2, 3)  # returned without waiting for the server
+    answer.set()
+    with player._update_lock:  # held until the background update is done
+        pass
+    assert player.pos == Vec3(4, 5, 6)
+    cache._stub.getPlayers.assert_called_once()
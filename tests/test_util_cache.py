@@ -50,3 +50,20 @@ def test_basic_use_weakref():
     del o
     gc.collect()
     assert cache.get(val) is None
+
+
+@pytest.mark.timeout(TIMEOUT)
+def test_get_or_create_many():
+    class TestObject:
+        def __init__(self, val) -> None:
+            self.val = val
+
+    cache = ThreadSafeSingeltonCache(TestObject, use_weakref=True)
+    o2 = cache.get_or_create(2)
+    objs = cache.get_or_create_many([1, 2, 3, 1])
+    assert [o.val for o in objs] == [1, 2, 3, 1]
+    assert objs[1] is o2
+    assert objs[0] is objs[3]
+    assert cache.get(1) is objs[0]
+    assert cache.get(3) is objs[2]
+    assert cache.get_or_create_many([]) == []
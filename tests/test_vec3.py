@@ -356,6 +356,10 @@ def test_frozen() -> None:
         v.z += 5  # type: ignore
 
 
+def test_no_instance_dict() -> None:
+    assert not hasattr(Vec3(1, 2, 3), "__dict__")
+
+
 def test_asdict() -> None:
     v = Vec3(1, 2, 3)
     assert v.asdict() == {"x": 1, "y": 2, "z": 3}
@@ -0,0 +1,254 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from mcproto import MCProtoFehler, Vec3
+from mcproto.mcpb import minecraft_pb2 as pb
+
+
+def test_world_by_name_refreshes_on_miss(cache):
+    world = cache.getWorldByName("world")
+    assert cache.getWorldByName("world") is world
+    cache._stub.accessWorlds.assert_called_once()
+
+    cache._stub.accessWorlds.return_value.worlds.add(
+        name="other", info=pb.WorldInfo(key="minecraft:other")
+    )
+    assert cache.getWorldByName("other").name == "other"
+    assert cache.getWorldByName("world") is world
+    assert cache._stub.accessWorlds.call_count == 2
+
+    with pytest.raises(MCProtoFehler):
+        cache.getWorldByName("missing")
+
+
+def test_set_block_list_floors_positions(cache):
+    world = cache.getWorldByName("world")
+    cache._stub.setBlocks.future.return_value.result.return_value = pb.Status()
+    world.setBlockList("stone", [Vec3(1.5, -0.5, 2), Vec3(-1, 0.99, -2.01)])
+    request = cache._stub.setBlocks.future.call_args.args[0]
+    assert [(pos.x, pos.y, pos.z) for pos in request.pos] == [(1, -1, 2), (-1, 0, -3)]
+
+
+def test_copy_and_paste_block_cube_batch_requests(cache):
+    world = cache.getWorldByName("world")
+
+    def get_block_future(request: pb.BlockRequest) -> MagicMock:
+        future = MagicMock()
+        blocktype = "stone" if request.pos.x == request.pos.z else "dirt"
+        future.result.return_value = pb.BlockResponse(info=pb.BlockInfo(blockType=blocktype))
+        return future
+
+    cache._stub.getBlock.future.side_effect = get_block_future
+    blocks = world.copyBlockCube(Vec3(1, 0, 1), Vec3(0, 0, 0))
+    assert blocks == [[["stone", "dirt"]], [["dirt", "stone"]]]
+    assert cache._stub.getBlock.future.call_count == 4
+    cache._stub.getBlock.assert_not_called()
+
+    cache._stub.setBlocks.future.return_value.result.return_value = pb.Status()
+    world.pasteBlockCube(blocks, Vec3(10, 0, 0))
+    assert cache._stub.setBlocks.future.call_count == 2
+    cache._stub.setBlock.assert_not_called()
+    pasted = {
+        request.info.blockType: [(pos.x, pos.y, pos.z) for pos in request.pos]
+        for request in (call.args[0] for call in cache._stub.setBlocks.future.call_args_list)
+    }
+    assert pasted == {"stone": [(10, 0, 0), (11, 0, 1)], "dirt": [(10, 0, 1), (11, 0, 0)]}
+
+
+def test_set_block_list_limits_pending_chunks(cache, monkeypatch):
+    monkeypatch.setattr("mcproto.world.MAX_BLOCKS", 1)
+    world = cache.getWorldByName("world")
+    futures = []
+
+    def set_blocks_future(request: pb.Blocks) -> MagicMock:
+        future = MagicMock()
+        future.result.return_value = pb.Status()
+        futures.append(future)
+        return future
+
+    cache._stub.setBlocks.future.side_effect = set_blocks_future
+    world.setBlockList("stone", [Vec3(x, 0, 0) for x in range(6)])
+    assert len(futures) == 6
+    assert all(future.result.call_count == 1 for future in futures)
+
+    # the first chunk fails, the chunks in flight are still awaited
+    futures.clear()
+    first_error = pb.Status(code=pb.MISSING_ARGUMENT)
+
+    def failing_first_future(request: pb.Blocks) -> MagicMock:
+        future = set_blocks_future(request)
+        if len(futures) == 1:
+            future.result.return_value = first_error
+        return future
+
+    cache._stub.setBlocks.future.side_effect = failing_first_future
+    with pytest.raises(MCProtoFehler):
+        world.setBlockList("stone", [Vec3(x, 0, 0) for x in range(6)])
+    assert len(futures) == 4  # raised before sending a fifth chunk
+    assert all(future.result.call_count == 1 for future in futures)
+    assert not any(future.cancel.called for future in futures)
+
+    # on an interrupt, the chunks in flight are cancelled instead
+    futures.clear()
+
+    def interrupted_first_future(request: pb.Blocks) -> MagicMock:
+        future = set_blocks_future(request)
+        if len(futures) == 1:
+            future.result.side_effect = KeyboardInterrupt
+        return future
+
+    cache._stub.setBlocks.future.side_effect = interrupted_first_future
+    with pytest.raises(KeyboardInterrupt):
+        world.setBlockList("stone", [Vec3(x, 0, 0) for x in range(6)])
+    assert len(futures) == 4
+    assert all(future.cancel.called for future in futures[1:])
+
+
+def test_set_slice_sends_generated_positions(cache, monkeypatch):
+    monkeypatch.setattr("mcproto.world.MAX_BLOCKS", 3)
+    world = cache.getWorldByName("world")
+    cache._stub.setBlocks.future.return_value.result.return_value = pb.Status()
+    world[0:2, 5, 0:3:2] = "stone"
+    sent = [
+        [(pos.x, pos.y, pos.z) for pos in call.args[0].pos]
+        for call in cache._stub.setBlocks.future.call_args_list
+    ]
+    assert sent == [[(0, 5, 0), (0, 5, 2), (1, 5, 0)], [(1, 5, 2)]]
+
+
+def test_entities_around_only_creates_entities_in_range(cache, pb_entity):
+    world = cache.getWorldByName("world")
+    cache._stub.getEntities.return_value = pb.EntityResponse(
+        entities=[
+            pb_entity("near", 1, 2, 2),
+            pb_entity("edge", 0, 3, 0),
+            pb_entity("far", 4, 0, 0),
+        ]
+    )
+    cache._get_or_create_entities = MagicMock(wraps=cache._get_or_create_entities)
+    entities = world.getEntitiesAround(Vec3(0, 0, 0), 3)
+    assert [e.id for e in entities] == ["near", "edge"]
+    assert entities[0].pos == Vec3(1, 2, 2)
+    cache._get_or_create_entities.assert_called_once_with(["near", "edge"])
+    assert world.getEntitiesAround(Vec3(0, 0, 0), -1) == []
+
+
+def test_world_message_is_shared_and_not_changed(cache):
+    world = cache.getWorldByName("world")
+    assert world._pb_world is world._pb_world
+    cache._stub.setBlock.return_value = pb.Status()
+    world.setBlock("stone", Vec3(1, 2, 3))
+    request = cache._stub.setBlock.call_args.args[0]
+    request.world.name = "changed"
+    assert world._pb_world.name == "world"
+
+
+def test_remove_entities_teleports_before_kill(cache):
+    world = cache.getWorldByName("world")
+    order = []
+
+    def run_command(request: pb.CommandRequest) -> pb.Status:
+        order.append(request.command.rsplit(" run ", 1)[-1])
+        return pb.Status()
+
+    cache._stub.runCommand.side_effect = run_command
+    world.removeEntities("pig")
+    assert order == ["tp @e[type=pig] 0 -50000 0", "kill @e[type=pig]"]
+    cache._stub.runCommand.future.assert_not_called()
+
+
+def test_get_block_list_limits_pending_requests(cache, monkeypatch):
+    monkeypatch.setattr("mcproto.world._MAX_PENDING_BLOCK_REQUESTS", 2)
+    world = cache.getWorldByName("world")
+    futures = []
+
+    def get_block_future(request: pb.BlockRequest) -> MagicMock:
+        # the oldest request is answered before a third one is sent
+        assert sum(not future.result.called for future in futures) < 2
+        future = MagicMock()
+        future.result.return_value = pb.BlockResponse(
+            info=pb.BlockInfo(blockType=f"block{request.pos.x}")
+        )
+        futures.append(future)
+        return future
+
+    cache._stub.getBlock.future.side_effect = get_block_future
+    blocks = world.getBlockList([Vec3(x, 0, 0) for x in range(5)])
+    assert blocks == [f"block{x}" for x in range(5)]
+    assert all(future.result.call_count == 1 for future in futures)
+
+
+def test_get_block_list_cancels_pending_requests_on_error(cache, monkeypatch):
+    monkeypatch.setattr("mcproto.world._MAX_PENDING_BLOCK_REQUESTS", 2)
+    world = cache.getWorldByName("world")
+    futures = []
+
+    def get_block_future(request: pb.BlockRequest) -> MagicMock:
+        future = MagicMock()
+        code = pb.WORLD_NOT_FOUND if request.pos.x == 1 else 0
+        future.result.return_value = pb.BlockResponse(status=pb.Status(code=code))
+        futures.append(future)
+        return future
+
+    cache._stub.getBlock.future.side_effect = get_block_future
+    with pytest.raises(MCProtoFehler):
+        world.getBlockList([Vec3(x, 0, 0) for x in range(5)])
+    # the error of the second block is read before the fourth request, the third is in flight
+    assert len(futures) == 3
+    assert not futures[1].cancel.called
+    futures[2].cancel.assert_called_once()
+
+
+def test_paste_block_cube_places_lower_layers_first(cache):
+    world = cache.getWorldByName("world")
+    cache._stub.setBlocks.future.return_value.result.return_value = pb.Status()
+    # a column of sand on stone on sand, in both x columns
+    blocks = [[["sand"], ["stone"], ["sand"]], [["sand"], ["stone"], ["sand"]]]
+    world.pasteBlockCube(blocks, Vec3(0, 10, 0))
+    sent = [
+        (call.args[0].info.blockType, [(pos.x, pos.y, pos.z) for pos in call.args[0].pos])
+        for call in cache._stub.setBlocks.future.call_args_list
+    ]
+    assert sent == [
+        ("sand", [(0, 10, 0), (1, 10, 0)]),
+        ("stone", [(0, 11, 0), (1, 11, 0)]),
+        ("sand", [(0, 12, 0), (1, 12, 0)]),
+    ]
+
+
+def test_get_entity_positions(cache, pb_entity):
+    np = pytest.importorskip("numpy")
+    world = cache.getWorldByName("world")
+    cache._stub.getEntities.return_value = pb.EntityResponse(
+        entities=[pb_entity("a", 1, 2, 3), pb_entity("b", -4, 5.5, 6)]
+    )
+    ids, positions = world.getEntityPositions()
+    assert ids == ["a", "b"]
+    assert positions.shape == (2, 3) and positions.dtype == np.float64
+    assert positions.tolist() == [[1, 2, 3], [-4, 5.5, 6]]
+    request = cache._stub.getEntities.call_args.args[0]
+    assert request.withLocations and not request.worldwide.includeNotSpawnable
+
+
+def test_get_entity_positions_empty(cache):
+    pytest.importorskip("numpy")
+    world = cache.getWorldByName("world")
+    cache._stub.getEntities.return_value = pb.EntityResponse()
+    ids, positions = world.getEntityPositions()
+    assert ids == []
+    assert positions.shape == (0, 3)
+
+
+def test_get_entity_positions_without_players(cache, pb_entity):
+    pytest.importorskip("numpy")
+    world = cache.getWorldByName("world")
+    player = pb_entity("p", 7, 8, 9)
+    player.type = "player"
+    cache._stub.getEntities.return_value = pb.EntityResponse(
+        entities=[pb_entity("a", 1, 2, 3), player]
+    )
+    ids, positions = world.getEntityPositions(only_spawnable=False)
+    assert ids == ["a"]
+    assert positions.tolist() == [[1, 2, 3]]
+    assert cache._stub.getEntities.call_args.args[0].worldwide.includeNotSpawnable
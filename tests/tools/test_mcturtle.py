@@ -232,3 +232,84 @@ def test_turn_and_move_right():
         ],
         any_order=False,
     )
+
+
+def test_move_forward_sets_blocks_of_one_tick_together(mocker: MockerFixture):
+    sleep = mocker.patch("mcproto.tools.mcturtle.sleep")
+    mocker.patch("mcproto.tools.mcturtle.monotonic", return_value=0.0)
+    mc = MagicMock(spec=Minecraft)
+    pos = Vec3(1, -2, 3)
+
+    t = Turtle(mc, pos).speed(40).forward(3)
+
+    assert t._body_pos == pos.east(3)
+    mc.assert_has_calls(
+        [
+            call.setBlock(t._head, pos),
+            call.setBlockList(t._body, [pos, pos.east()]),
+            call.setBlock(t._head, pos.east(2)),
+            call.setBlockList(t._body, [pos.east(2)]),
+            call.setBlock(t._head, pos.east(3)),
+        ],
+        any_order=False,
+    )
+    # sleeps until each group is due, measured from the start of the movement
+    assert [c.args[0] for c in sleep.call_args_list] == [2 / 40, 3 / 40]
+
+
+def test_move_forward_does_not_sleep_when_behind(mocker: MockerFixture):
+    sleep = mocker.patch("mcproto.tools.mcturtle.sleep")
+    mocker.patch("mcproto.tools.mcturtle.monotonic", side_effect=[0.0, 0.5, 0.6])
+    mc = MagicMock(spec=Minecraft)
+
+    Turtle(mc, Vec3(1, -2, 3)).speed(40).forward(3)
+
+    sleep.assert_not_called()
+
+
+def test_move_forward_diagonal_sends_each_block_once(mocker: MockerFixture):
+    mocker.patch("mcproto.tools.mcturtle.sleep")
+    mc = MagicMock(spec=Minecraft)
+
+    Turtle(mc, Vec3(0.1, 0, 0.1)).speed(1000).right(45).forward(10)
+
+    (body,) = [c.args[1] for c in mc.setBlockList.call_args_list]
+    assert len(body) == len(set(body)) < 10
+
+
+def test_move_forward_along_axis_after_turn_stays_exact(mocker: MockerFixture):
+    mocker.patch("mcproto.tools.mcturtle.sleep")
+    mc = MagicMock(spec=Minecraft)
+
+    t = Turtle(mc, Vec3(0, 0, 0)).speed(1000).right(90).forward(3)
+
+    assert t._pos == Vec3(0, 0, 3)
+
+
+def test_move_forward_invisible_does_not_step(mocker: MockerFixture):
+    sleep = mocker.patch("mcproto.tools.mcturtle.sleep")
+    mc = MagicMock(spec=Minecraft)
+    pos = Vec3(1, -2, 3)
+
+    t = Turtle(mc, pos).penup().hidehead()
+    mc.reset_mock()
+    t.forward(5)
+
+    assert t._body_pos == pos.east(5)
+    assert not mc.mock_calls
+    sleep.assert_not_called()
+
+
+def test_hidehead_only_paints_on_change_and_showhead_repaints():
+    mc = MagicMock(spec=Minecraft)
+    pos = Vec3(1, -2, 3)
+
+    t = Turtle(mc, pos)
+    mc.reset_mock()
+    t.hidehead().hidehead().showhead().head("gold_block").showhead()
+
+    assert mc.setBlock.call_args_list == [
+        call("air", pos),
+        call("diamond_block", pos),
+        call("gold_block", pos),
+    ]